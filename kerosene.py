@@ -86,17 +86,23 @@ http://www.famfamfam.com/
 # Imports ----------------------------------------------------------------------
 
 # standard library modules
+import argparse
 import time
 import pickle
-from collections import Counter
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import datetime as dt
 from idlelib.ToolTip import ToolTip
-from itertools import chain
+import csv
+from itertools import chain, islice, repeat
+import hashlib
 import json
+import multiprocessing
 import os
+import queue
 from shutil import copy
 import sqlite3
-from threading import Thread
+from threading import Event, RLock, Thread
 import tkinter as tk
 import tkinter.ttk as ttk
 import tkinter.filedialog as fd
@@ -109,8 +115,10 @@ if getattr(sys, 'frozen', False):
 
 # third-party modules
 import matplotlib
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba
 from matplotlib.figure import Figure
-from mpl_toolkits.basemap import Basemap
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, \
     NavigationToolbar2TkAgg
 import numpy as np
@@ -168,7 +176,1457 @@ CREDITS = (
     'consult the terms of the MIT License at'
     ' opensource.org/licenses/MIT.')
 
-IATA_CODE_LIST = []
+DATABASE_PATH = 'data/database.kr'
+AIRPORTS_PATH = 'data/airports_data.sqlite'
+
+# flight_data columns, in table order
+FLIGHT_FIELDS = ('date', 'flight_number', 'plane_model', 'take_off_time',
+                 'landing_time', 'flight_duration', 'departure', 'destination',
+                 'carrier', 'iata_dep', 'iata_des', 'latitude_dep',
+                 'longitude_dep', 'city_dep', 'city_des', 'latitude_des',
+                 'longitude_des')
+
+# connection settings applied every time the flight database is opened
+PRAGMAS = ('PRAGMA journal_mode=TRUNCATE',
+           'PRAGMA temp_store=MEMORY',
+           'PRAGMA cache_size=-8192')
+
+# flight database layout version, stored in the file's user_version pragma
+SCHEMA_VERSION = 6
+
+# flight keys offered at a time by the find dialog's autocompletion
+FIND_COMPLETIONS = 50
+
+# mean Earth radius used for great-circle distances
+EARTH_RADIUS_KM = 6371.0
+
+# directory holding the serialized base map between runs
+MAP_CACHE_DIR = 'data/cache'
+
+# Basemap projection of the route and airport maps
+MAP_PROJECTION = {'projection': 'robin', 'lat_0': 43.0, 'lon_0': 12.0,
+                  'resolution': 'c', 'area_thresh': 100000}
+
+# prebuilt projected base map geometry, written by --build-geometry
+GEOMETRY_PATH = 'data/map_geometry.npz'
+
+# number of latitudes sampled by the geometry file's projection tables
+PROJECTION_TABLE_SIZE = 3601
+
+# finer geometry resolutions swapped in when zooming in, with the share of
+# the map width below which each one is used
+DETAIL_LEVELS = (('l', 0.4), ('i', 0.12))
+
+# (columns, rows) of tiles the finer geometry is stored in, and the number
+# of tiles kept in memory
+DETAIL_TILES = (12, 6)
+DETAIL_TILES_KEPT = 64
+
+# number of points along each great-circle route
+GREAT_CIRCLE_POINTS = 100
+
+# airport positions above which the airports map shows a density heatmap
+# instead of markers, and the heatmap's (columns, rows) of bins
+HEATMAP_THRESHOLD = 2000
+HEATMAP_BINS = (120, 60)
+
+# routes or airport markers drawn per step when a map tab is shown, and the
+# milliseconds between steps
+OVERLAY_CHUNK_SIZE = 500
+OVERLAY_CHUNK_DELAY = 10
+
+# base map figure size, in inches, colours and line widths
+MAP_FIGURE_SIZE = (6, 3)
+MAP_STYLE = {'background': 'lightgray', 'coastlines': 'black',
+             'coastline_width': 1, 'countries': '#ddaa66',
+             'continents': '#ddaa66', 'water': '#b0c4de',
+             'boundary': 'black', 'boundary_width': 2, 'graticule': 'black'}
+
+# resolution, in dots per inch, and image formats of exported maps
+EXPORT_DPI = 200
+EXPORT_FORMATS = ('png', 'svg')
+
+# number of rows staged per executemany call by the bulk importer
+IMPORT_BATCH_SIZE = 5000
+
+# field names used by JSON exports, mapped to flight_data columns
+EXPORT_FIELD_NAMES = {'iata_departure': 'iata_dep',
+                      'iata_destination': 'iata_des',
+                      'latitude_departure': 'latitude_dep',
+                      'longitude_departure': 'longitude_dep',
+                      'city_departure': 'city_dep',
+                      'city_destination': 'city_des',
+                      'latitude_destination': 'latitude_des',
+                      'longitude_destination': 'longitude_des'}
+
+
+# Helper functions -------------------------------------------------------------
+
+
+def parse_duration(text):
+    """Converts a stored time string to a number of seconds.
+
+       Accepts the "H:MM:SS" strings written by earlier versions of the program,
+       including the "-1 day, 22:00:00" form produced by str(timedelta), the
+       "H:MM" form flight durations are usually written in, and numbers of
+       seconds, as numbers or strings such as "3600". Numbers are returned as
+       integers and None is passed through.
+
+       Raises:
+           ValueError: The text is none of the above."""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return int(text)
+    if ':' not in text:  # a number of seconds
+        return int(float(text))
+    days = 0
+    if 'day' in text:
+        day_part, text = text.split(',')
+        days = int(day_part.split()[0])
+    parts = [int(part) for part in text.split(':')]
+    if len(parts) == 2:  # H:MM
+        parts.append(0)
+    hours, minutes, seconds = parts
+    return days * 86400 + hours * 3600 + minutes * 60 + seconds
+
+
+def split_key(key):
+    """Splits a flight key in its date and same-day sequence number.
+
+       Keys are saved in a YYYY-MM-DD format. If two flights are recorded in
+       the same date a "-(VALUE)" tag is added to the key, e.g. 2015-05-4-(2)
+       is split into ('2015-05-4', 2) while 2015-05-04 gives ('2015-05-04', 0)."""
+    if key.endswith(')') and '-(' in key:
+        day, seq = key.rsplit('-(', 1)
+        return day, int(seq[:-1])
+    return key, 0
+
+
+def make_key(day, seq=0):
+    """Builds a flight key from a date and a same-day sequence number."""
+    if seq:
+        return '{}-({:d})'.format(day, seq)
+    return day
+
+
+def batches(iterable, size):
+    """Yields lists of up to size items taken from iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def parse_coordinate(text):
+    """Converts a stored latitude/longitude to a float, or None if invalid."""
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def format_duration(seconds):
+    """Formats a number of seconds in a HOURS:MINUTES:SECONDS format."""
+    if seconds is None:
+        return ''
+    sign = '-' if seconds < 0 else ''
+    minutes, seconds = divmod(abs(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return '{}{:d}:{:02d}:{:02d}'.format(sign, hours, minutes, seconds)
+
+
+def format_distance(kilometres):
+    """Formats a distance in whole kilometres."""
+    return '{:,.0f} km'.format(kilometres)
+
+
+def haversine_km(latitude_dep, longitude_dep, latitude_des, longitude_des):
+    """Returns great-circle distances in kilometres.
+
+       Coordinates are given in degrees, as numbers or as equally sized
+       sequences, in which case every distance is computed at once and a NumPy
+       array is returned."""
+    phi_1, lambda_1, phi_2, lambda_2 = (
+        np.radians(np.asarray(value, dtype=float)) for value in
+        (latitude_dep, longitude_dep, latitude_des, longitude_des))
+    a = (np.sin((phi_2 - phi_1) / 2) ** 2 +
+         np.cos(phi_1) * np.cos(phi_2) * np.sin((lambda_2 - lambda_1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def projection_key():
+    """Returns a string identifying the MAP_PROJECTION parameters."""
+    return repr(sorted(MAP_PROJECTION.items()))
+
+
+def great_circle(lon_dep, lat_dep, lon_des, lat_des,
+                 points=GREAT_CIRCLE_POINTS):
+    """Returns the longitudes and latitudes of points along great circles.
+
+       Coordinates are given in degrees, as numbers or as equally sized
+       sequences. Every route is interpolated at once, by spherical linear
+       interpolation between the endpoints' unit vectors; the returned arrays
+       hold one row of points per route."""
+    phi_1, lambda_1, phi_2, lambda_2 = (
+        np.radians(np.atleast_1d(np.asarray(value, dtype=float)))[:, None]
+        for value in (lat_dep, lon_dep, lat_des, lon_des))
+    start = np.array([np.cos(phi_1) * np.cos(lambda_1),
+                      np.cos(phi_1) * np.sin(lambda_1), np.sin(phi_1)])
+    end = np.array([np.cos(phi_2) * np.cos(lambda_2),
+                    np.cos(phi_2) * np.sin(lambda_2), np.sin(phi_2)])
+    omega = np.arccos(np.clip((start * end).sum(axis=0), -1.0, 1.0))
+    steps = np.linspace(0.0, 1.0, points)
+    sin_omega = np.sin(omega)
+    curved = sin_omega > 1e-12  # identical endpoints need no interpolation
+    divisor = np.where(curved, sin_omega, 1.0)
+    weight_1 = np.where(curved, np.sin((1 - steps) * omega) / divisor,
+                        1 - steps)
+    weight_2 = np.where(curved, np.sin(steps * omega) / divisor, steps)
+    x, y, z = weight_1 * start + weight_2 * end
+    return (np.degrees(np.arctan2(y, x)),
+            np.degrees(np.arctan2(z, np.hypot(x, y))))
+
+
+def split_at_seam(x, y, width):
+    """Splits a projected polyline where it crosses the edge of the map.
+
+       Returns a list of (x, y) pieces, cut wherever two consecutive points
+       are more than half the map width apart."""
+    cuts = np.nonzero(np.abs(np.diff(x)) > width / 2)[0] + 1
+    return list(zip(np.split(x, cuts), np.split(y, cuts)))
+
+
+def project_great_circles(m, lon_dep, lat_dep, lon_des, lat_des,
+                          points=GREAT_CIRCLE_POINTS):
+    """Returns the projected x and y arrays of great circles.
+
+       Every route is interpolated and projected at once; the returned arrays
+       hold one row of points per route, not yet split at the map's edge.
+
+       Args:
+           m: The projection, a MapGeometry or a Basemap.
+           lon_dep, lat_dep, lon_des, lat_des: Route endpoints in degrees, as
+                                               numbers or equally sized
+                                               sequences."""
+    lons, lats = great_circle(lon_dep, lat_dep, lon_des, lat_des, points)
+    x, y = m(lons.ravel(), lats.ravel())
+    return np.reshape(x, lons.shape), np.reshape(y, lats.shape)
+
+
+def split_routes(x, y, width):
+    """Returns polylines, ready for a LineCollection, from projected routes.
+
+       Routes crossing the edge of the map are split in pieces, so the second
+       value returned holds the index of the route each polyline belongs to.
+
+       Args:
+           x, y: Projected points, one row per route.
+           width: The width of the map."""
+    crossing = (np.abs(np.diff(x, axis=1)) > width / 2).any(axis=1)
+    polylines = list(np.dstack([x[~crossing], y[~crossing]]))
+    routes = np.nonzero(~crossing)[0].tolist()
+    for route in np.nonzero(crossing)[0]:
+        for x_piece, y_piece in split_at_seam(x[route], y[route], width):
+            polylines.append(np.column_stack([x_piece, y_piece]))
+            routes.append(route)
+    return polylines, np.array(routes, dtype=int)
+
+
+def route_segments(m, lon_dep, lat_dep, lon_des, lat_des,
+                   points=GREAT_CIRCLE_POINTS):
+    """Returns projected great-circle polylines, ready for a LineCollection.
+
+       Combines project_great_circles() and split_routes(): the second value
+       returned holds the index of the route each polyline belongs to."""
+    x, y = project_great_circles(m, lon_dep, lat_dep, lon_des, lat_des,
+                                 points)
+    return split_routes(x, y, m.urcrnrx - m.llcrnrx)
+
+
+def tile_polylines(polylines, extent):
+    """Cuts polylines into pieces lying in a single DETAIL_TILES tile.
+
+       Consecutive pieces share the vertex at which a polyline leaves a tile,
+       so no edge is lost. Returns a dictionary mapping the index of each
+       tile, row * columns + column, to its list of pieces."""
+    x_min, x_max, y_min, y_max = extent
+    columns, rows = DETAIL_TILES
+    tiles = {}
+    for polyline in polylines:
+        polyline = np.asarray(polyline)
+        column = np.clip(((polyline[:, 0] - x_min) / (x_max - x_min) *
+                          columns).astype(int), 0, columns - 1)
+        row = np.clip(((polyline[:, 1] - y_min) / (y_max - y_min) *
+                       rows).astype(int), 0, rows - 1)
+        indices = row * columns + column
+        cuts = np.nonzero(np.diff(indices))[0] + 1
+        for start, end in zip(np.concatenate([[0], cuts]),
+                              np.concatenate([cuts + 1, [len(polyline)]])):
+            tiles.setdefault(int(indices[start]), []).append(
+                polyline[start:end])
+    return tiles
+
+
+def build_map_geometry(target):
+    """Writes the projected base map geometry used instead of Basemap.
+
+       Coastlines, country borders, continents, lakes, the graticule and the
+       map boundary are drawn once with Basemap for MAP_PROJECTION and their
+       projected vertices saved to a NumPy .npz file, together with the
+       per-latitude tables MapGeometry projects coordinates with. Coastlines
+       and borders are also saved at each DETAIL_LEVELS resolution, cut into
+       tiles that are loaded separately. The file is written under a
+       temporary name first."""
+    from mpl_toolkits.basemap import Basemap
+    ax = Figure().add_subplot(111)
+    m = Basemap(ax=ax, **MAP_PROJECTION)
+    water = to_rgba(MAP_STYLE['water'])
+    polygons = m.fillcontinents(color=MAP_STYLE['continents'],
+                                lake_color=MAP_STYLE['water'])
+    graticule = chain(m.drawmeridians(np.arange(0, 360, 30)).values(),
+                      m.drawparallels(np.arange(-90, 90, 30)).values())
+    layers = {'coastlines': m.drawcoastlines().get_segments(),
+              'countries': m.drawcountries().get_segments(),
+              'continents': [polygon.get_xy() for polygon in polygons
+                             if not np.allclose(polygon.get_facecolor(),
+                                                water)],
+              'lakes': [polygon.get_xy() for polygon in polygons
+                        if np.allclose(polygon.get_facecolor(), water)],
+              'graticule': [line.get_xydata() for lines, _ in graticule
+                            for line in lines],
+              'boundary': [m.drawmapboundary().get_xy()]}
+
+    # x = centre + scale * longitude offset and y = height, per latitude
+    lon_0 = MAP_PROJECTION['lon_0']
+    latitudes = np.linspace(-90, 90, PROJECTION_TABLE_SIZE)
+    centre, heights = m(np.full_like(latitudes, lon_0), latitudes)
+    scale = (m(np.full_like(latitudes, lon_0 + 90), latitudes)[0] -
+             centre) / 90
+
+    arrays = {'projection': np.array(projection_key()),
+              'extent': np.array([m.llcrnrx, m.urcrnrx,
+                                  m.llcrnry, m.urcrnry]),
+              'latitudes': latitudes, 'centre': centre, 'scale': scale,
+              'heights': heights}
+    for resolution, _ in DETAIL_LEVELS:
+        detailed = Basemap(ax=Figure().add_subplot(111),
+                           **dict(MAP_PROJECTION, resolution=resolution,
+                                  area_thresh=None))
+        for layer, lines in (('coastlines', detailed.drawcoastlines()),
+                             ('countries', detailed.drawcountries())):
+            tiles = tile_polylines(lines.get_segments(), arrays['extent'])
+            for tile, pieces in tiles.items():
+                layers['{}_{}_{:d}'.format(layer, resolution, tile)] = pieces
+    for name, lines in layers.items():
+        arrays[name + '_vertices'] = np.concatenate(lines).astype(np.float32)
+        arrays[name + '_offsets'] = np.cumsum([0] + [len(line)
+                                                     for line in lines])
+    temporary = target + '.tmp.npz'
+    np.savez_compressed(temporary, **arrays)
+    os.replace(temporary, target)
+
+
+def build_airports_database(source, target):
+    """Writes an optimized copy of the airports reference database.
+
+       The copy stores coordinates as REAL values, indexes the iata column and
+       is analyzed and vacuumed. It is written to a temporary file first, so
+       source and target may be the same file."""
+    temporary = target + '.tmp'
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    database = sqlite3.connect(temporary, isolation_level=None)
+    try:
+        database.create_function('parse_coordinate', 1, parse_coordinate)
+        database.execute('ATTACH DATABASE ? AS source', (source,))
+        database.execute('BEGIN')
+        database.execute("""CREATE TABLE airports (id INTEGER PRIMARY KEY,
+                                                 name TEXT,
+                                                 city TEXT,
+                                                 country TEXT,
+                                                 iata TEXT,
+                                                 latitude REAL,
+                                                 longitude REAL)""")
+        database.execute("""INSERT INTO airports
+                            SELECT id, name, city, country, iata,
+                                   parse_coordinate(latitude),
+                                   parse_coordinate(longitude)
+                            FROM source.airports ORDER BY id""")
+        database.execute('CREATE INDEX airports_iata ON airports (iata)')
+        database.execute('COMMIT')
+        database.execute('DETACH DATABASE source')
+        database.execute('ANALYZE')
+        database.execute('VACUUM')
+    finally:
+        database.close()
+    os.replace(temporary, target)
+
+
+def is_airports_database_optimized(path):
+    """Returns True if the airports database has an index on iata."""
+    database = sqlite3.connect(path)
+    try:
+        return database.execute("SELECT 1 FROM sqlite_master WHERE "
+                                "type='index' AND name='airports_iata'"
+                                ).fetchone() is not None
+    finally:
+        database.close()
+
+
+# Database access layer --------------------------------------------------------
+
+
+class FlightStore(object):
+    """Owns the program's database connections.
+
+       This class is the single access point to the flight database and to the
+       airports reference database. Both files are opened once, on a single
+       long-lived connection that stays open for the lifetime of the program,
+       so that sqlite3's prepared statement cache is reused across calls
+       instead of being rebuilt by every connect/close cycle.
+
+       The airports database is attached to the connection under the
+       'airports' schema name. Access to the connection is serialized with a
+       re-entrant lock, allowing the store to be shared with worker threads."""
+
+    COLUMNS = ', '.join(FLIGHT_FIELDS)
+
+    # statistics counters kept in statistics_counts: category name and the
+    # flight_data column expression counted, written against the row alias
+    ROLLUP_VALUES = (('airport', '{row}.departure'),
+                     ('airport', '{row}.destination'),
+                     ('carrier', '{row}.carrier'),
+                     ('aircraft', '{row}.plane_model'),
+                     ('city', '{row}.city_dep'),
+                     ('city', '{row}.city_des'),
+                     ('year', 'substr({row}.date, 1, 4)'))
+
+    def __init__(self, path=DATABASE_PATH, airports_path=AIRPORTS_PATH):
+        """Sets database paths. The connection is opened on first use.
+
+           Args:
+               path: Path to the flight database file, created if missing.
+               airports_path: Path to the airports reference database."""
+        self.path = path
+        self.airports_path = airports_path
+        self.airports_generation = 0  # counts rebuilds of the airports file
+        self.lock = RLock()
+        self._database = None
+
+    @property
+    def database(self):
+        """Returns the open connection, connecting if necessary."""
+        with self.lock:
+            if self._database is None:
+                self._database = self.connect()
+            return self._database
+
+    def connect(self):
+        """Opens, tunes and prepares a connection to the flight database.
+
+           An airports database without the iata index, such as a copy made
+           by an earlier release, is upgraded the first time it is opened."""
+        self.upgrade_airports_database()
+        database = sqlite3.connect(self.path, check_same_thread=False,
+                                   cached_statements=256)
+        database.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            database.execute(pragma)
+        database.create_function('parse_duration', 1, parse_duration)
+        database.create_function('parse_coordinate', 1, parse_coordinate)
+        database.create_function('key_day', 1, lambda key: split_key(key)[0])
+        database.create_function('key_seq', 1, lambda key: split_key(key)[1])
+        database.create_function('make_key', 2, make_key)
+        try:
+            database.execute('ATTACH DATABASE ? AS airports',
+                             (self.airports_path,))
+            self.migrate(database)
+        except sqlite3.Error:
+            database.close()
+            raise
+        return database
+
+    def upgrade_airports_database(self):
+        """Rebuilds the airports database in place if it isn't optimized.
+
+           Failures are ignored, e.g. when the program is installed in a
+           read-only folder; lookups then keep working on the original file.
+           A successful rebuild increments airports_generation, which tells
+           AirportCache instances to reload."""
+        try:
+            if not is_airports_database_optimized(self.airports_path):
+                build_airports_database(self.airports_path,
+                                        self.airports_path)
+                self.airports_generation += 1
+        except (OSError, sqlite3.Error):
+            pass
+
+    @staticmethod
+    def migrate_to_1(database):
+        """Creates the original all-TEXT flight_data table if missing.
+
+           Version 1 is the layout used before the schema was versioned, so
+           files written by earlier releases are already at this version."""
+        database.execute("""CREATE TABLE IF NOT EXISTS flight_data (
+                                date TEXT,
+                                flight_number TEXT,
+                                plane_model TEXT,
+                                take_off_time TEXT,
+                                landing_time TEXT,
+                                flight_duration TEXT,
+                                departure TEXT,
+                                destination TEXT,
+                                carrier TEXT,
+                                iata_dep TEXT,
+                                iata_des TEXT,
+                                latitude_dep TEXT,
+                                longitude_dep TEXT,
+                                city_dep TEXT,
+                                city_des TEXT,
+                                latitude_des TEXT,
+                                longitude_des TEXT)""")
+
+    @staticmethod
+    def migrate_to_2(database):
+        """Converts flight_data to native column types.
+
+           Times and durations become INTEGER seconds, coordinates become REAL
+           and an INTEGER primary key and an index on date are added."""
+        database.execute("""CREATE TABLE flight_data_typed (
+                                id INTEGER PRIMARY KEY,
+                                date TEXT NOT NULL,
+                                flight_number TEXT,
+                                plane_model TEXT,
+                                take_off_time INTEGER,
+                                landing_time INTEGER,
+                                flight_duration INTEGER,
+                                departure TEXT,
+                                destination TEXT,
+                                carrier TEXT,
+                                iata_dep TEXT,
+                                iata_des TEXT,
+                                latitude_dep REAL,
+                                longitude_dep REAL,
+                                city_dep TEXT,
+                                city_des TEXT,
+                                latitude_des REAL,
+                                longitude_des REAL)""")
+        database.execute("""INSERT INTO flight_data_typed ({})
+                            SELECT date, flight_number, plane_model,
+                                   parse_duration(take_off_time),
+                                   parse_duration(landing_time),
+                                   parse_duration(flight_duration),
+                                   departure, destination, carrier,
+                                   iata_dep, iata_des,
+                                   parse_coordinate(latitude_dep),
+                                   parse_coordinate(longitude_dep),
+                                   city_dep, city_des,
+                                   parse_coordinate(latitude_des),
+                                   parse_coordinate(longitude_des)
+                            FROM flight_data ORDER BY rowid""".format(
+            ', '.join(FLIGHT_FIELDS)))
+        database.execute('DROP TABLE flight_data')
+        database.execute('ALTER TABLE flight_data_typed RENAME TO flight_data')
+        database.execute('CREATE INDEX flight_data_date ON flight_data (date)')
+
+    @staticmethod
+    def migrate_to_3(database):
+        """Adds indexed day and seq columns mirroring the parts of each key.
+
+           They let new keys for an already used date be allocated with an
+           index lookup instead of a scan of every key in the table."""
+        database.execute('ALTER TABLE flight_data ADD COLUMN day TEXT')
+        database.execute('ALTER TABLE flight_data ADD COLUMN seq INTEGER')
+        database.execute('UPDATE flight_data SET day=key_day(date), '
+                         'seq=key_seq(date)')
+        database.execute('CREATE INDEX flight_data_day '
+                         'ON flight_data (day, seq)')
+
+    @staticmethod
+    def migrate_to_4(database):
+        """Adds the statistics rollup tables.
+
+           statistics_totals holds a single row with the flight count and the
+           total flight time, statistics_counts the number of flights per
+           category value. The tables are filled, and the triggers keeping
+           them up to date on every insert, update and delete are created, by
+           migrate() once every step has run, so reading the statistics no
+           longer depends on the size of the logbook. The longest flight is
+           read from an index on flight_duration."""
+        database.execute("""CREATE TABLE statistics_totals (
+                                id INTEGER PRIMARY KEY CHECK (id = 0),
+                                flights INTEGER NOT NULL,
+                                seconds INTEGER NOT NULL)""")
+        database.execute('INSERT INTO statistics_totals VALUES (0, 0, 0)')
+        database.execute("""CREATE TABLE statistics_counts (
+                                category TEXT NOT NULL,
+                                value TEXT NOT NULL,
+                                flights INTEGER NOT NULL,
+                                PRIMARY KEY (category, value))""")
+        database.execute('CREATE INDEX statistics_counts_top ON '
+                         'statistics_counts (category, flights DESC, value)')
+        database.execute('CREATE INDEX flight_data_duration '
+                         'ON flight_data (flight_duration)')
+
+    @classmethod
+    def migrate_to_5(cls, database):
+        """Adds cached great-circle distances and their rollups.
+
+           The distance of every stored flight is computed at once into the new
+           distance_km column, and the rollup tables gain running distance
+           totals and a count of the flights with a known distance."""
+        database.execute('ALTER TABLE flight_data ADD COLUMN distance_km REAL')
+        database.execute('ALTER TABLE statistics_totals ADD COLUMN '
+                         'sectors INTEGER NOT NULL DEFAULT 0')
+        database.execute('ALTER TABLE statistics_totals ADD COLUMN '
+                         'distance REAL NOT NULL DEFAULT 0')
+        database.execute('ALTER TABLE statistics_counts ADD COLUMN '
+                         'distance REAL NOT NULL DEFAULT 0')
+        database.execute('CREATE INDEX flight_data_distance '
+                         'ON flight_data (distance_km)')
+        database.execute('CREATE INDEX statistics_counts_distance ON '
+                         'statistics_counts (category, distance DESC, value)')
+        cls.fill_distances(database)
+
+    @staticmethod
+    def migrate_to_6(database):
+        """Adds the route_geometry table caching projected great circles.
+
+           Rows hold the projected points of a route's great circle, as
+           float32 x and y blobs, tagged with the endpoints' coordinates and
+           with the projection they were computed for."""
+        database.execute("""CREATE TABLE route_geometry (
+                                iata_dep TEXT NOT NULL,
+                                iata_des TEXT NOT NULL,
+                                projection TEXT NOT NULL,
+                                latitude_dep REAL,
+                                longitude_dep REAL,
+                                latitude_des REAL,
+                                longitude_des REAL,
+                                x BLOB NOT NULL,
+                                y BLOB NOT NULL,
+                                PRIMARY KEY (iata_dep, iata_des))""")
+
+    @classmethod
+    def create_statistics_triggers(cls, database):
+        """Creates the triggers keeping the statistics rollups up to date."""
+        added = cls.rollup_statements('NEW', 1)
+        removed = cls.rollup_statements('OLD', -1)
+        for event, statements in (('INSERT', added),
+                                  ('DELETE', removed),
+                                  ('UPDATE', removed + added)):
+            database.execute('CREATE TRIGGER statistics_{} AFTER {} ON '
+                             'flight_data BEGIN {} END'.format(
+                                 event.lower(), event, ' '.join(statements)))
+
+    @staticmethod
+    def drop_statistics_triggers(database):
+        """Drops the statistics triggers, if they exist."""
+        for event in ('insert', 'delete', 'update'):
+            database.execute('DROP TRIGGER IF EXISTS statistics_' + event)
+
+    @classmethod
+    def rollup_statements(cls, row, step):
+        """Returns the trigger statements adding a row to the rollups.
+
+           Args:
+               row: The trigger row alias, NEW or OLD.
+               step: 1 to count the row in, -1 to count it out."""
+        statements = ['UPDATE statistics_totals SET flights=flights+{0:d}, '
+                      'seconds=seconds+{0:d}*IFNULL({1}.flight_duration, 0), '
+                      'sectors=sectors+{0:d}*({1}.distance_km IS NOT NULL), '
+                      'distance=distance+{0:d}*IFNULL({1}.distance_km, 0);'
+                      .format(step, row)]
+        for category, expression in cls.ROLLUP_VALUES:
+            value = expression.format(row=row)
+            if step > 0:
+                statements.append(
+                    "INSERT OR IGNORE INTO statistics_counts "
+                    "(category, value, flights) "
+                    "SELECT '{0}', {1}, 0 WHERE IFNULL({1}, '') != '';"
+                    .format(category, value))
+            statements.append(
+                "UPDATE statistics_counts SET flights=flights+{0:d}, "
+                "distance=distance+{0:d}*IFNULL({1}.distance_km, 0) "
+                "WHERE category='{2}' AND value={3};".format(step, row,
+                                                              category, value))
+            if step < 0:
+                statements.append(
+                    "DELETE FROM statistics_counts WHERE category='{}' "
+                    "AND value={} AND flights<=0;".format(category, value))
+        return statements
+
+    @classmethod
+    def rebuild_statistics(cls, database):
+        """Recomputes the statistics rollups from flight_data.
+
+           Runs inside the caller's transaction."""
+        database.execute('DELETE FROM statistics_counts')
+        database.execute(
+            """INSERT INTO statistics_counts (category, value, flights,
+                                             distance)
+               SELECT category, value, COUNT(*), TOTAL(distance) FROM ({})
+               WHERE IFNULL(value, '') != ''
+               GROUP BY category, value""".format(' UNION ALL '.join(
+                "SELECT '{}' AS category, {} AS value, "
+                "distance_km AS distance FROM flight_data"
+                .format(category, expression.format(row='flight_data'))
+                for category, expression in cls.ROLLUP_VALUES)))
+        database.execute("""UPDATE statistics_totals SET
+                                flights=(SELECT COUNT(*) FROM flight_data),
+                                seconds=(SELECT IFNULL(SUM(flight_duration), 0)
+                                         FROM flight_data),
+                                sectors=(SELECT COUNT(distance_km)
+                                         FROM flight_data),
+                                distance=(SELECT TOTAL(distance_km)
+                                          FROM flight_data)""")
+
+    @staticmethod
+    def fill_distances(database, table='flight_data'):
+        """Computes the missing distances of flights with known coordinates.
+
+           The coordinates are read in one query and every distance computed
+           with a single vectorized haversine_km call. Runs inside the
+           caller's transaction.
+
+           Args:
+               database: The connection to use.
+               table: flight_data or a staging table with the same columns.
+
+           Returns the number of distances filled in."""
+        cursor = database.cursor()
+        cursor.row_factory = None  # plain tuples are cheaper to build
+        rows = cursor.execute(
+            """SELECT rowid, latitude_dep, longitude_dep, latitude_des,
+                      longitude_des FROM {}
+               WHERE distance_km IS NULL
+               AND latitude_dep IS NOT NULL AND longitude_dep IS NOT NULL
+               AND latitude_des IS NOT NULL AND longitude_des IS NOT NULL"""
+            .format(table)).fetchall()
+        if not rows:
+            return 0
+        columns = list(zip(*rows))
+        distances = haversine_km(*columns[1:])
+        database.executemany('UPDATE {} SET distance_km=? WHERE rowid=?'
+                             .format(table),
+                             zip(distances.tolist(), columns[0]))
+        return len(rows)
+
+    @staticmethod
+    def record_distance(record):
+        """Returns the distance flown by a FLIGHT_FIELDS record, or None if
+           any of its coordinates is missing."""
+        coordinates = [record.get(field) for field in
+                       ('latitude_dep', 'longitude_dep', 'latitude_des',
+                        'longitude_des')]
+        if None in coordinates:
+            return None
+        return float(haversine_km(*coordinates))
+
+    def migrate(self, database):
+        """Upgrades the flight database to SCHEMA_VERSION.
+
+           Each migrate_to_N step runs in order, inside a single transaction
+           together with the user_version update, so an interrupted upgrade
+           leaves the file untouched. The statistics triggers are dropped
+           while the steps run, then recreated for the current schema and the
+           rollups rebuilt."""
+        version = database.execute('PRAGMA user_version').fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        isolation_level = database.isolation_level
+        database.isolation_level = None  # manage the transaction by hand
+        try:
+            database.execute('BEGIN IMMEDIATE')
+            try:
+                self.drop_statistics_triggers(database)
+                for step in range(version + 1, SCHEMA_VERSION + 1):
+                    getattr(self, 'migrate_to_{:d}'.format(step))(database)
+                self.create_statistics_triggers(database)
+                self.rebuild_statistics(database)
+                database.execute('PRAGMA user_version={:d}'.format(
+                    SCHEMA_VERSION))
+                database.execute('COMMIT')
+            except sqlite3.Error:
+                database.execute('ROLLBACK')
+                raise
+        finally:
+            database.isolation_level = isolation_level
+
+    def close(self):
+        """Closes the connection; it is re-opened on the next call."""
+        with self.lock:
+            if self._database is not None:
+                self._database.close()
+                self._database = None
+
+    def get_flight(self, key):
+        """Returns the flight_data row stored under key, or None.
+
+           Rows hold the FLIGHT_FIELDS columns in order and can be indexed by
+           position or by column name."""
+        with self.lock:
+            return self.database.execute(
+                'SELECT {} FROM flight_data WHERE date=?'.format(
+                    self.COLUMNS), (key,)).fetchone()
+
+    def list_keys(self, after=None, limit=-1):
+        """Returns flight keys sorted by date.
+
+           Keys are read from the date index starting at after, so the cost
+           doesn't grow with the number of keys sorted before it.
+
+           Args:
+               after: Only keys sorted after this one are returned, all of
+                      them if None.
+               limit: Maximum number of keys returned, all of them if
+                      negative."""
+        with self.lock:
+            if after is None:
+                return [row[0] for row in self.database.execute(
+                    'SELECT date FROM flight_data ORDER BY date LIMIT ?',
+                    (limit,))]
+            return [row[0] for row in self.database.execute(
+                'SELECT date FROM flight_data WHERE date>? '
+                'ORDER BY date LIMIT ?', (after, limit))]
+
+    def list_keys_before(self, before=None, limit=-1):
+        """Returns the limit flight keys sorted last before before.
+
+           The keys are returned sorted by date, the last ones of the
+           logbook if before is None."""
+        with self.lock:
+            if before is None:
+                rows = self.database.execute(
+                    'SELECT date FROM flight_data ORDER BY date DESC '
+                    'LIMIT ?', (limit,)).fetchall()
+            else:
+                rows = self.database.execute(
+                    'SELECT date FROM flight_data WHERE date<? '
+                    'ORDER BY date DESC LIMIT ?', (before, limit)).fetchall()
+        return [row[0] for row in reversed(rows)]
+
+    def complete_keys(self, prefix, limit):
+        """Returns up to limit flight keys starting with prefix, sorted by date.
+
+           The keys are read from a range of the date index, so completing a
+           prefix doesn't depend on the size of the logbook."""
+        if not prefix:
+            return self.list_keys(limit=limit)
+        end = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with self.lock:
+            return [row[0] for row in self.database.execute(
+                'SELECT date FROM flight_data WHERE date>=? AND date<? '
+                'ORDER BY date LIMIT ?', (prefix, end, limit))]
+
+    def count_flights(self):
+        """Returns the number of flights, read from the statistics rollups."""
+        with self.lock:
+            return self.database.execute(
+                'SELECT flights FROM statistics_totals').fetchone()[0]
+
+    def key_position(self, key):
+        """Returns the number of flight keys sorted before key.
+
+           Keys of earlier years are counted from the statistics rollups, so
+           only the keys of key's own year are read from the date index."""
+        year = key[:4]
+        with self.lock:
+            earlier = self.database.execute(
+                "SELECT IFNULL(SUM(flights), 0) FROM statistics_counts "
+                "WHERE category='year' AND value<?", (year,)).fetchone()[0]
+            return earlier + self.database.execute(
+                'SELECT COUNT(*) FROM flight_data WHERE date>=? AND date<?',
+                (year, key)).fetchone()[0]
+
+    def key_at(self, position):
+        """Returns the flight key with position keys sorted before it.
+
+           The year holding the key is found from the statistics rollups and
+           only that year's keys are read from the date index. Returns None
+           if there are no more than position keys."""
+        with self.lock:
+            for year, flights in self.database.execute(
+                    "SELECT value, flights FROM statistics_counts "
+                    "WHERE category='year' ORDER BY value").fetchall():
+                if position < flights:
+                    row = self.database.execute(
+                        'SELECT date FROM flight_data WHERE date>=? '
+                        'ORDER BY date LIMIT 1 OFFSET ?',
+                        (year, position)).fetchone()
+                    return row and row[0]
+                position -= flights
+        return None
+
+    def iter_flights(self, chunk_size=1000):
+        """Yields every flight_data row, fetching chunk_size rows at a time.
+
+           The lock is held only while a chunk is fetched, so other threads
+           may use the store between chunks."""
+        with self.lock:
+            cursor = self.database.execute(
+                'SELECT {} FROM flight_data'.format(self.COLUMNS))
+        while True:
+            with self.lock:
+                rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+
+    def allocate_key(self, day, current=None):
+        """Returns a free key for a flight recorded on day.
+
+           The first flight of a day is keyed by the date itself, later ones
+           get the next "-(VALUE)" tag. The highest tag in use is read from the
+           (day, seq) index, so the cost does not depend on the table size.
+
+           Args:
+               day: The flight date, in the YYYY-MM-DD format.
+               current: The key of the flight being edited, if any. It is kept
+                        when the flight's date has not changed."""
+        if current is not None and split_key(current)[0] == day:
+            return current
+        with self.lock:
+            seq = self.database.execute('SELECT MAX(seq) FROM flight_data '
+                                        'WHERE day=?', (day,)).fetchone()[0]
+        if seq is None:
+            return day
+        return make_key(day, seq + 1)
+
+    def insert(self, record):
+        """Inserts a new flight.
+
+           Args:
+               record: A dictionary mapping FLIGHT_FIELDS names to values."""
+        command = 'INSERT INTO flight_data ({}, day, seq, distance_km) ' \
+                  'VALUES ({}, :day, :seq, :distance_km)'.format(
+                      ', '.join(FLIGHT_FIELDS),
+                      ', '.join(':' + field for field in FLIGHT_FIELDS))
+        day, seq = split_key(record['date'])
+        parameters = dict(record, day=day, seq=seq,
+                          distance_km=self.record_distance(record))
+        with self.lock, self.database:
+            self.database.execute(command, parameters)
+
+    def update(self, key, record):
+        """Replaces the flight stored under key with record."""
+        command = 'UPDATE flight_data SET {}, day=:day, seq=:seq, ' \
+                  'distance_km=:distance_km WHERE date=:key'.format(
+                      ', '.join('{0}=:{0}'.format(field)
+                                for field in FLIGHT_FIELDS))
+        day, seq = split_key(record['date'])
+        parameters = dict(record, key=key, day=day, seq=seq,
+                          distance_km=self.record_distance(record))
+        with self.lock, self.database:
+            self.database.execute(command, parameters)
+
+    def delete(self, key):
+        """Deletes the flight stored under key."""
+        with self.lock, self.database:
+            self.database.execute('DELETE FROM flight_data WHERE date=?',
+                                  (key,))
+
+    def read_columns(self, *expressions):
+        """Reads whole flight_data columns in a single query.
+
+           Args:
+               expressions: SQL column expressions to select.
+
+           Returns a list holding one tuple of values per expression, or an
+           empty list if the table is empty."""
+        with self.lock:
+            cursor = self.database.cursor()
+            cursor.row_factory = None  # plain tuples are cheaper to build
+            rows = cursor.execute('SELECT {} FROM flight_data'.format(
+                ', '.join(expressions))).fetchall()
+        return list(zip(*rows))
+
+    def read_statistics(self):
+        """Returns the LogbookSummary held by the statistics rollups.
+
+           Only the totals row, the top row of each category and the index
+           range of the city counters are read."""
+        with self.lock:
+            flights, seconds, sectors, distance = self.database.execute(
+                'SELECT flights, seconds, sectors, distance '
+                'FROM statistics_totals').fetchone()
+            longest = self.database.execute(
+                'SELECT IFNULL(MAX(flight_duration), 0) '
+                'FROM flight_data').fetchone()[0]
+            longest_km = self.database.execute(
+                'SELECT IFNULL(MAX(distance_km), 0) '
+                'FROM flight_data').fetchone()[0]
+            cities = self.database.execute(
+                "SELECT COUNT(*) FROM statistics_counts "
+                "WHERE category='city'").fetchone()[0]
+            top = {}
+            for category, _ in self.ROLLUP_VALUES:
+                row = self.database.execute(
+                    'SELECT value FROM statistics_counts WHERE category=? '
+                    'ORDER BY flights DESC, value LIMIT 1',
+                    (category,)).fetchone()
+                top[category] = row[0] if row is not None else ''
+            top_distance = {}
+            for category in ('carrier', 'aircraft'):
+                row = self.database.execute(
+                    'SELECT value FROM statistics_counts WHERE category=? '
+                    'ORDER BY distance DESC, value LIMIT 1',
+                    (category,)).fetchone()
+                top_distance[category] = row[0] if row is not None else ''
+        return LogbookSummary(flights, seconds, longest, cities, top, sectors,
+                              distance, longest_km, top_distance)
+
+    def read_rollups(self):
+        """Returns the whole content of the statistics rollups.
+
+           The result is a LogbookStatistics, comparable with the one computed
+           by StatisticsEngine from flight_data."""
+        with self.lock:
+            flights, seconds, sectors, distance = self.database.execute(
+                'SELECT flights, seconds, sectors, distance '
+                'FROM statistics_totals').fetchone()
+            longest, longest_km = self.database.execute(
+                'SELECT IFNULL(MAX(flight_duration), 0), '
+                'IFNULL(MAX(distance_km), 0) FROM flight_data').fetchone()
+            counts = dict((category, {}) for category, _ in
+                          self.ROLLUP_VALUES)
+            distances = dict((category, {}) for category in counts)
+            for category, value, tally, total in self.database.execute(
+                    'SELECT category, value, flights, distance '
+                    'FROM statistics_counts'):
+                counts[category][value] = tally
+                distances[category][value] = total
+        return LogbookStatistics(flights, seconds, longest, counts, sectors,
+                                 distance, longest_km, distances)
+
+    def repair_statistics(self):
+        """Rebuilds the statistics rollups from flight_data."""
+        with self.lock, self.database:
+            self.rebuild_statistics(self.database)
+
+    def list_routes(self):
+        """Returns the distinct routes flown and how often each was flown.
+
+           Rows hold the departure and destination IATA codes, the departure
+           latitude and longitude, the destination latitude and longitude and
+           the number of flights, for every pair of endpoints with known
+           coordinates."""
+        with self.lock:
+            cursor = self.database.cursor()
+            cursor.row_factory = None  # plain tuples are cheaper to build
+            return cursor.execute(
+                """SELECT iata_dep, iata_des, latitude_dep, longitude_dep,
+                          latitude_des, longitude_des, COUNT(*)
+                   FROM flight_data
+                   WHERE latitude_dep IS NOT NULL
+                   AND longitude_dep IS NOT NULL
+                   AND latitude_des IS NOT NULL
+                   AND longitude_des IS NOT NULL
+                   GROUP BY iata_dep, iata_des, latitude_dep, longitude_dep,
+                            latitude_des, longitude_des""").fetchall()
+
+    def read_route_geometry(self, projection):
+        """Returns the cached great circles computed for a projection.
+
+           The result maps (iata_dep, iata_des) pairs to the route's endpoint
+           coordinates and its projected x and y arrays."""
+        with self.lock:
+            cursor = self.database.cursor()
+            cursor.row_factory = None  # plain tuples are cheaper to build
+            return dict(
+                ((iata_dep, iata_des),
+                 ((lat_dep, lon_dep, lat_des, lon_des),
+                  np.frombuffer(x, dtype=np.float32),
+                  np.frombuffer(y, dtype=np.float32)))
+                for iata_dep, iata_des, lat_dep, lon_dep, lat_des, lon_des,
+                x, y in cursor.execute(
+                    'SELECT iata_dep, iata_des, latitude_dep, longitude_dep, '
+                    'latitude_des, longitude_des, x, y FROM route_geometry '
+                    'WHERE projection=?', (projection,)))
+
+    def write_route_geometry(self, projection, routes):
+        """Caches great circles computed for a projection.
+
+           Rows cached for any other projection are deleted at the same time.
+
+           Args:
+               projection: The projection the routes were computed for.
+               routes: (iata_dep, iata_des, latitude_dep, longitude_dep,
+                       latitude_des, longitude_des, x, y) tuples, x and y
+                       being float32 arrays."""
+        with self.lock, self.database:
+            self.database.execute('DELETE FROM route_geometry '
+                                  'WHERE projection!=?', (projection,))
+            self.database.executemany(
+                'INSERT OR REPLACE INTO route_geometry VALUES '
+                '(?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                ((route[0], route[1], projection) + tuple(route[2:6]) +
+                 (route[6].tobytes(), route[7].tobytes())
+                 for route in routes))
+
+    def list_visited_airports(self, year=None):
+        """Returns the airports visited and how often each was visited.
+
+           Departures and destinations are counted together, in a single
+           query grouping them by position. Rows hold an IATA code, the
+           latitude, the longitude and the number of visits of every airport
+           with known coordinates.
+
+           Args:
+               year: Only count the flights of this year, such as '2017'."""
+        where, parameters = '', ()
+        if year is not None:
+            where = 'WHERE date >= ? AND date < ?'
+            parameters = (str(year), str(int(year) + 1)) * 2
+        with self.lock:
+            cursor = self.database.cursor()
+            cursor.row_factory = None  # plain tuples are cheaper to build
+            return cursor.execute(
+                """SELECT MAX(iata), latitude, longitude, COUNT(*) FROM (
+                       SELECT iata_dep AS iata, latitude_dep AS latitude,
+                              longitude_dep AS longitude FROM flight_data
+                       {0}
+                       UNION ALL
+                       SELECT iata_des, latitude_des, longitude_des
+                       FROM flight_data {0})
+                   WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+                   GROUP BY latitude, longitude""".format(where),
+                parameters).fetchall()
+
+    def list_years(self):
+        """Returns the years with flights, oldest first, from the rollups."""
+        with self.lock:
+            return [row[0] for row in self.database.execute(
+                "SELECT value FROM statistics_counts WHERE category='year' "
+                "ORDER BY value")]
+
+    def list_airports(self):
+        """Returns iata, name, city, country, latitude and longitude of every
+           airport in the airports database."""
+        with self.lock:
+            return self.database.execute(
+                'SELECT iata, name, city, country, latitude, longitude '
+                'FROM airports.airports').fetchall()
+
+    def bulk_insert(self, records, batch_size=IMPORT_BATCH_SIZE):
+        """Inserts many flights in a single transaction.
+
+           Records are staged batch_size at a time with executemany into a
+           temporary table and copied to a second one by one INSERT ... SELECT
+           joined against the airports database, which fills in any missing
+           airport names, cities and coordinates from the records' IATA codes.
+           Distances are computed there, for a whole batch at once, before the
+           rows are moved into flight_data. Every record gets a new key for its
+           date, following the "-(VALUE)" convention for dates already in use.
+
+           Args:
+               records: An iterable of dictionaries mapping FLIGHT_FIELDS names
+                        to values, missing values being None.
+               batch_size: Number of records staged per batch.
+
+           Returns the number of flights inserted."""
+        columns = ', '.join(FLIGHT_FIELDS)
+        stage = 'INSERT INTO temp.import_raw ({}, day, seq) ' \
+                'VALUES ({}, ?, ?)'.format(columns,
+                                           ', '.join('?' * len(FLIGHT_FIELDS)))
+        locate = """INSERT INTO temp.import_stage ({}, day, seq)
+                    SELECT s.date, s.flight_number, s.plane_model,
+                           s.take_off_time, s.landing_time, s.flight_duration,
+                           COALESCE(s.departure, dep.name),
+                           COALESCE(s.destination, des.name),
+                           s.carrier, s.iata_dep, s.iata_des,
+                           COALESCE(s.latitude_dep,
+                                    parse_coordinate(dep.latitude)),
+                           COALESCE(s.longitude_dep,
+                                    parse_coordinate(dep.longitude)),
+                           COALESCE(s.city_dep, dep.city),
+                           COALESCE(s.city_des, des.city),
+                           COALESCE(s.latitude_des,
+                                    parse_coordinate(des.latitude)),
+                           COALESCE(s.longitude_des,
+                                    parse_coordinate(des.longitude)),
+                           s.day, s.seq
+                    FROM temp.import_raw AS s
+                    LEFT JOIN airports.airports AS dep ON dep.iata = s.iata_dep
+                    LEFT JOIN airports.airports AS des ON des.iata = s.iata_des
+                    ORDER BY s.rowid""".format(columns)
+        move = """INSERT INTO flight_data ({0}, day, seq, distance_km)
+                  SELECT {0}, day, seq, distance_km FROM temp.import_stage
+                  ORDER BY rowid""".format(columns)
+        next_seq = {}
+        count = 0
+        with self.lock:
+            database = self.database
+            database.execute('CREATE TEMP TABLE IF NOT EXISTS import_raw '
+                             '({}, day, seq)'.format(columns))
+            database.execute('CREATE TEMP TABLE IF NOT EXISTS import_stage '
+                             '({}, day, seq, distance_km)'.format(columns))
+            database.execute('DELETE FROM temp.import_raw')
+            database.execute('DELETE FROM temp.import_stage')
+            with database:
+                for batch in batches(records, batch_size):
+                    rows = []
+                    for record in batch:
+                        day = split_key(record['date'])[0]
+                        if day not in next_seq:
+                            seq = database.execute(
+                                'SELECT MAX(seq) FROM flight_data '
+                                'WHERE day=?', (day,)).fetchone()[0]
+                            next_seq[day] = 0 if seq is None else seq + 1
+                        seq = next_seq[day]
+                        next_seq[day] += 1
+                        rows.append((make_key(day, seq),) +
+                                    tuple(record.get(field)
+                                          for field in FLIGHT_FIELDS[1:]) +
+                                    (day, seq))
+                    database.executemany(stage, rows)
+                    database.execute(locate)
+                    database.execute('DELETE FROM temp.import_raw')
+                    self.fill_distances(database, 'temp.import_stage')
+                    database.execute(move)
+                    database.execute('DELETE FROM temp.import_stage')
+                    count += len(rows)
+        return count
+
+    def merge(self, path):
+        """Adds the flights stored in another Kerosene database file.
+
+           The file is attached to the connection and its rows are moved with
+           set-based INSERT ... SELECT statements in a single transaction.
+           Flights identical to one already stored (same date, flight number,
+           times and airports) are skipped, using the (day, seq) index to find
+           candidates. The others are keyed after the flights already recorded
+           on their date, following the "-(VALUE)" convention. Files written by
+           any version of the program can be merged.
+
+           Returns a (merged, skipped) tuple of flight counts."""
+        converted = """make_key(key_day(date), 0), flight_number, plane_model,
+                       parse_duration(take_off_time),
+                       parse_duration(landing_time),
+                       parse_duration(flight_duration),
+                       departure, destination, carrier, iata_dep, iata_des,
+                       parse_coordinate(latitude_dep),
+                       parse_coordinate(longitude_dep),
+                       city_dep, city_des,
+                       parse_coordinate(latitude_des),
+                       parse_coordinate(longitude_des),
+                       key_day(date)"""
+        with self.lock:
+            database = self.database
+            database.execute('ATTACH DATABASE ? AS merged', (path,))
+            try:
+                database.execute('CREATE TEMP TABLE IF NOT EXISTS merge_stage '
+                                 '({}, day, seq, distance_km)'.format(
+                                     self.COLUMNS))
+                database.execute('CREATE INDEX IF NOT EXISTS '
+                                 'temp.merge_stage_day ON merge_stage (day)')
+                database.execute('DELETE FROM temp.merge_stage')
+                with database:
+                    total = database.execute(
+                        'INSERT INTO temp.merge_stage ({}, day) '
+                        'SELECT {} FROM merged.flight_data '
+                        'ORDER BY date'.format(self.COLUMNS,
+                                               converted)).rowcount
+
+                    # skip flights already in the logbook
+                    skipped = database.execute(
+                        """DELETE FROM temp.merge_stage WHERE EXISTS (
+                               SELECT 1 FROM main.flight_data AS f
+                               WHERE f.day = merge_stage.day
+                               AND f.flight_number IS merge_stage.flight_number
+                               AND f.take_off_time IS merge_stage.take_off_time
+                               AND f.landing_time IS merge_stage.landing_time
+                               AND f.iata_dep IS merge_stage.iata_dep
+                               AND f.iata_des IS merge_stage.iata_des)"""
+                    ).rowcount
+
+                    # number the remaining flights after each day's last key
+                    database.execute(
+                        """UPDATE temp.merge_stage SET seq =
+                               COALESCE((SELECT MAX(f.seq)
+                                         FROM main.flight_data AS f
+                                         WHERE f.day = merge_stage.day), -1)
+                               + 1 + (SELECT COUNT(*)
+                                      FROM temp.merge_stage AS s
+                                      WHERE s.day = merge_stage.day
+                                      AND s.rowid < merge_stage.rowid)""")
+                    self.fill_distances(database, 'temp.merge_stage')
+                    database.execute(
+                        'INSERT INTO main.flight_data ({0}, day, seq, '
+                        'distance_km) '
+                        'SELECT make_key(day, seq), {1}, day, seq, distance_km '
+                        'FROM temp.merge_stage ORDER BY day, seq'.format(
+                            self.COLUMNS, ', '.join(FLIGHT_FIELDS[1:])))
+                    database.execute('DELETE FROM temp.merge_stage')
+            finally:
+                database.execute('DETACH DATABASE merged')
+        return total - skipped, skipped
+
+
+# Airport reference cache ------------------------------------------------------
+
+
+class AirportCache(object):
+    """In-memory copy of the airports reference database.
+
+       Maps IATA codes to (name, city, country, latitude, longitude) tuples.
+       The airports table is read once on a background thread, so lookups made
+       by the uploader/editor tab are dictionary accesses instead of database
+       queries. Lookups wait for the loading thread only if it hasn't finished
+       yet. The table is reloaded by refresh(), which lookups call themselves
+       once the store has rebuilt the reference database; a file rebuilt by
+       another process with --build-airports is only seen after a restart."""
+
+    def __init__(self, store):
+        """Sets the store airports are read from. Nothing is loaded yet."""
+        self.store = store
+        self.airports = {}
+        self.codes = []
+        self.error = None
+        self.generation = None
+        self.loaded = Event()
+        self.thread = None
+
+    def load(self):
+        """Starts loading the airports table on a background thread."""
+        self.loaded.clear()
+        self.thread = Thread(target=self.read_airports, daemon=True)
+        self.thread.start()
+
+    def refresh(self):
+        """Discards the cached airports and reloads them."""
+        if self.thread is not None:
+            self.loaded.wait()
+        self.load()
+
+    def read_airports(self):
+        """Reads the airports table into memory. Runs on the loader thread."""
+        try:
+            airports = {}
+            for iata, name, city, country, latitude, longitude in \
+                    self.store.list_airports():
+                airports[iata] = (name, city, country,
+                                  parse_coordinate(latitude),
+                                  parse_coordinate(longitude))
+            self.airports = airports
+            self.codes = sorted(iata for iata in airports if iata != '---')
+            self.error = None
+        except sqlite3.Error as error:
+            self.error = error
+        finally:
+            # read after the query, which may have rebuilt the file
+            self.generation = self.store.airports_generation
+            self.loaded.set()
+
+    def wait_loaded(self):
+        """Blocks until the airports are loaded, starting the load if needed.
+
+           The airports are reloaded first if the reference database was
+           rebuilt since they were read. Re-raises the database error met by
+           the loading thread, if any."""
+        if self.thread is None:
+            self.load()
+        elif self.loaded.is_set() and \
+                self.generation != self.store.airports_generation:
+            self.refresh()
+        self.loaded.wait()
+        if self.error is not None:
+            raise self.error
+
+    def get(self, iata):
+        """Returns (name, city, country, latitude, longitude), or None."""
+        self.wait_loaded()
+        return self.airports.get(iata)
+
+    def iata_codes(self):
+        """Returns the sorted list of known IATA codes."""
+        self.wait_loaded()
+        return self.codes
+
+
+# Bulk flight importer ---------------------------------------------------------
+
+
+class FlightFileReader(object):
+    """Streams flight records out of CSV or JSON files.
+
+       CSV files need a header row naming flight_data columns. JSON files use
+       the layout written by Gui.generate_json: an object of flight records
+       keyed by date. Field names used by the JSON export are accepted in CSV
+       headers as well. Times and durations may be given in seconds or in the
+       H:MM:SS or H:MM formats. Records without a YYYY-MM-DD date, or with
+       unreadable times, are skipped and counted."""
+
+    def __init__(self, path):
+        """Sets the file path and resets the skipped records counter."""
+        self.path = path
+        self.skipped = 0
+
+    def __iter__(self):
+        """Yields normalized records, ready for FlightStore.bulk_insert."""
+        if self.path.lower().endswith('.json'):
+            raw_records = self.read_json()
+        else:
+            raw_records = self.read_csv()
+        for raw_record in raw_records:
+            record = self.normalize(raw_record)
+            if record is None:
+                self.skipped += 1
+            else:
+                yield record
+
+    def read_csv(self):
+        """Yields the rows of a CSV file as dictionaries."""
+        with open(self.path, newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                yield row
+
+    def read_json(self):
+        """Yields the records of a JSON export file."""
+        with open(self.path, encoding='utf-8') as file:
+            data = json.load(file)
+        if isinstance(data, dict):
+            data = data.values()
+        for record in data:
+            yield record
+
+    @staticmethod
+    def normalize(raw_record):
+        """Converts a raw record to native flight_data types.
+
+           Returns None if the record has no valid date, which would not split
+           into a year, month and day as a flight key, or an unreadable time
+           or duration."""
+        record = {}
+        for name, value in raw_record.items():
+            if name is None:
+                continue  # surplus CSV cells
+            name = EXPORT_FIELD_NAMES.get(name.strip(), name.strip())
+            if isinstance(value, str):
+                value = value.strip() or None
+            record[name] = value
+        if not record.get('date'):
+            return None
+        try:
+            dt.datetime.strptime(split_key(str(record['date']))[0],
+                                 '%Y-%m-%d')
+            for field in ('take_off_time', 'landing_time', 'flight_duration'):
+                record[field] = parse_duration(record.get(field))
+        except ValueError:
+            return None
+        for field in ('latitude_dep', 'longitude_dep',
+                      'latitude_des', 'longitude_des'):
+            record[field] = parse_coordinate(record.get(field))
+        if record['flight_duration'] is None \
+                and record['take_off_time'] is not None \
+                and record['landing_time'] is not None:
+            record['flight_duration'] = (record['landing_time'] -
+                                         record['take_off_time'])
+        return record
 
 
 # Search box autocompletion code -----------------------------------------------
@@ -182,17 +1640,25 @@ class AutocompleteEntry(tk.Entry):
         Subclass of tkinter.Entry that features autocompletion.
 
         To enable autocompletion use set_completion_list(list) to define
-        a list of possible strings to hit.
+        a list of possible strings to hit, or set_completion_query(function)
+        to look the hits for the typed prefix up when they are needed.
         To cycle through hits use down and up arrow keys.
         """
 
     def set_completion_list(self, completion_list):
         self._completion_list = completion_list
+        self._completion_query = None
         self._hits = []
         self._hit_index = 0
         self.position = 0
         self.bind('<KeyRelease>', self.handle_keyrelease)
 
+    def set_completion_query(self, completion_query):
+        """ set a function returning the hits for a prefix
+        :param completion_query: """
+        self.set_completion_list([])
+        self._completion_query = completion_query
+
     def autocomplete(self, delta=0):
         """ autocomplete the Entry,
         delta may be 0/1/-1 to cycle through possible hits
@@ -203,6 +1669,8 @@ class AutocompleteEntry(tk.Entry):
             self.position = len(self.get())
         # collect hits
         _hits = []
+        if self._completion_query is not None:
+            _hits = self._completion_query(self.get().lower())
         for element in self._completion_list:
             if element.startswith(self.get().lower()):
                 _hits.append(element)
@@ -245,6 +1713,185 @@ class AutocompleteEntry(tk.Entry):
             self.autocomplete()
 
 
+# Virtual key list -------------------------------------------------------------
+
+
+class KeyList(tk.Listbox):
+    """Flight key listbox holding only the rows it shows.
+
+       The listbox never contains more keys than fit in its height: they are
+       read from the flight database's date index next to the keys already
+       shown as the list is scrolled, and the scrollbar is driven from the
+       flight count kept in the statistics rollups. Populating and scrolling
+       the list therefore take the same time whatever the size of the
+       logbook; scrollbar jumps only read the keys of one year.
+
+       The selected key is remembered while it is scrolled out of view, and
+       the arrow, page, home and end keys and the mouse wheel move through
+       the whole logbook rather than the visible rows."""
+
+    # rows scrolled by one step of the mouse wheel
+    WHEEL_ROWS = 3
+
+    def __init__(self, master=None, store=None, scrollbar=None, **kwargs):
+        """Creates the listbox and takes control of its scrollbar.
+
+           Args:
+               store: The FlightStore keys are read from.
+               scrollbar: The tk.Scrollbar scrolling the list."""
+        super().__init__(master, **kwargs)
+        self.store = store
+        self.scrollbar = scrollbar
+        self.scrollbar.config(command=self.scroll)
+        self.count = 0
+        self.first = 0
+        self.keys = []
+        self.selected = None
+        self.bind('<<ListboxSelect>>', self.remember_selection)
+        self.bind('<MouseWheel>', self.wheel)
+        self.bind('<Button-4>', self.wheel)
+        self.bind('<Button-5>', self.wheel)
+        for sequence, rows in (('<Up>', -1), ('<Down>', 1),
+                               ('<Prior>', -self.rows), ('<Next>', self.rows)):
+            self.bind(sequence, lambda event, rows=rows: self.move(rows))
+        self.bind('<Home>', lambda event: self.move(-self.count))
+        self.bind('<End>', lambda event: self.move(self.count))
+
+    @property
+    def rows(self):
+        """Number of rows shown by the listbox."""
+        return int(self.cget('height'))
+
+    def refresh(self):
+        """Reads the flight count again and shows the first page of keys.
+
+           The selection is cleared."""
+        self.count = self.store.count_flights()
+        self.selected = None
+        self.show(0, self.store.list_keys(limit=self.rows))
+
+    def show(self, first, keys):
+        """Fills the listbox with keys, the first of them at position first.
+
+           Rows are shaded in alternating colours by their position in the
+           logbook, and the selected key is highlighted if it is visible."""
+        self.first = first
+        self.keys = keys
+        self.delete(0, tk.END)
+        if self.keys:
+            self.insert(0, *self.keys)
+        for row in range(len(self.keys)):
+            if (self.first + row) % 2 == 0:
+                self.itemconfig(row, background='#f0f0ff')
+        if self.selected in self.keys:
+            row = self.keys.index(self.selected)
+            self.selection_set(row)
+            self.activate(row)
+        if self.count:
+            self.scrollbar.set(self.first / self.count,
+                               (self.first + len(self.keys)) / self.count)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def show_position(self, first):
+        """Shows the page of keys starting at position first.
+
+           The first and last pages are read from the ends of the date index,
+           the others from the key found at position first."""
+        first = max(0, min(first, self.count - self.rows))
+        if first == 0:
+            self.show(0, self.store.list_keys(limit=self.rows))
+        elif first == self.count - self.rows:
+            self.show(first, self.store.list_keys_before(limit=self.rows))
+        else:
+            key = self.store.key_at(first)
+            self.show(first, [key] + self.store.list_keys(key, self.rows - 1))
+
+    def shift(self, rows):
+        """Scrolls the list by rows keys, stopping at either end.
+
+           Moves of up to a page read the keys next to the ones shown from
+           the date index; longer ones jump to the new position."""
+        if abs(rows) > self.rows or not self.keys:
+            self.show_position(self.first + rows)
+        elif rows > 0:
+            keys = self.store.list_keys(self.keys[-1], rows)
+            self.show(self.first + len(keys), (self.keys + keys)[len(keys):])
+        elif rows < 0:
+            keys = self.store.list_keys_before(self.keys[0], -rows)
+            self.show(self.first - len(keys), (keys + self.keys)[:self.rows])
+
+    def scroll(self, *args):
+        """Scrollbar command: moves the page of keys shown."""
+        if args[0] == 'moveto':
+            self.show_position(int(round(float(args[1]) * self.count)))
+        elif args[0] == 'scroll':
+            step = self.rows if args[2] == 'pages' else 1
+            self.shift(int(args[1]) * step)
+
+    def wheel(self, event):
+        """Scrolls the list with the mouse wheel."""
+        if event.num == 5 or event.delta < 0:
+            self.shift(self.WHEEL_ROWS)
+        else:
+            self.shift(-self.WHEEL_ROWS)
+        return 'break'
+
+    def remember_selection(self, event=None):
+        """Keeps the key selected with the mouse."""
+        selection = self.curselection()
+        if selection:
+            self.selected = self.keys[selection[0]]
+
+    def move(self, rows):
+        """Selects the key rows positions away from the selected one.
+
+           The list is scrolled as needed to show the new selection."""
+        if not self.count:
+            return 'break'
+        if self.selected is not None and self.selected not in self.keys:
+            self.select_key(self.selected)
+        if self.selected in self.keys:
+            row = self.keys.index(self.selected) + rows
+        else:
+            row = rows - 1 if rows > 0 else rows
+        if row < 0:
+            self.shift(row)
+            row = 0
+        elif row >= len(self.keys):
+            self.shift(row - len(self.keys) + 1)
+            row = len(self.keys) - 1
+        if self.keys:
+            self.selected = self.keys[row]
+            self.selection_clear(0, tk.END)
+            self.selection_set(row)
+            self.activate(row)
+        return 'break'
+
+    def select_key(self, key):
+        """Selects key and scrolls it to the middle of the list.
+
+           The keys around it are read from the date index on both sides of
+           key; only its position is looked up, for the scrollbar."""
+        self.selected = key
+        before = self.store.list_keys_before(key, self.rows // 2)
+        after = self.store.list_keys(key, self.rows - 1 - len(before))
+        if len(before) + len(after) < self.rows - 1:  # near the end
+            before = self.store.list_keys_before(key,
+                                                 self.rows - 1 - len(after))
+        self.show(self.store.key_position(key) - len(before),
+                  before + [key] + after)
+
+    def selected_key(self):
+        """Returns the selected key.
+
+           Raises:
+               tk.TclError: No key is selected."""
+        if self.selected is None:
+            raise tk.TclError('no flight selected')
+        return self.selected
+
+
 # Matplotlib custom toolbar ----------------------------------------------------
 
 # noinspection PyAbstractClass
@@ -266,6 +1913,117 @@ class CustomToolbar(NavigationToolbar2TkAgg):
         NavigationToolbar2TkAgg.__init__(self, canvas_, parent_)
 
 
+# Statistics engine ------------------------------------------------------------
+
+
+LogbookStatistics = namedtuple('LogbookStatistics', ['flights',
+                                                     'total_seconds',
+                                                     'longest_seconds',
+                                                     'counts',
+                                                     'sectors',
+                                                     'total_km',
+                                                     'longest_km',
+                                                     'distances'])
+
+LogbookSummary = namedtuple('LogbookSummary', ['flights', 'total_seconds',
+                                               'longest_seconds', 'cities',
+                                               'top', 'sectors', 'total_km',
+                                               'longest_km', 'top_distance'])
+
+
+class StatisticsEngine(object):
+    """Computes logbook statistics in a single pass over flight_data.
+
+       Only the columns the statistics need are read, once, into NumPy arrays.
+       Totals and maxima are then computed with array reductions, and the
+       number of flights and the distance flown per carrier, aircraft,
+       airport, city and year with np.unique and np.bincount, instead of
+       Python loops over every row."""
+
+    # counted categories and the positions of their columns in COLUMNS
+    CATEGORIES = (('airport', (1, 2)),
+                  ('carrier', (3,)),
+                  ('aircraft', (4,)),
+                  ('city', (5, 6)),
+                  ('year', (7,)))
+
+    COLUMNS = ('IFNULL(flight_duration, 0)',
+               "IFNULL(departure, '')",
+               "IFNULL(destination, '')",
+               "IFNULL(carrier, '')",
+               "IFNULL(plane_model, '')",
+               "IFNULL(city_dep, '')",
+               "IFNULL(city_des, '')",
+               'substr(date, 1, 4)',
+               'distance_km')
+
+    @classmethod
+    def compute(cls, store):
+        """Returns the LogbookStatistics of the flights held by store.
+
+           counts maps each category name to a dictionary of flight counts
+           keyed by value and distances to the kilometres flown; blank values
+           are not counted. Flights without a distance count as 0 km."""
+        columns = store.read_columns(*cls.COLUMNS)
+        if not columns:
+            return LogbookStatistics(0, 0, 0, dict((name, {}) for name, _ in
+                                                   cls.CATEGORIES), 0, 0.0,
+                                     0.0, dict((name, {}) for name, _ in
+                                               cls.CATEGORIES))
+        durations = np.array(columns[0], dtype=np.int64)
+        kilometres = np.array(columns[8], dtype=float)  # NULL becomes nan
+        measured = ~np.isnan(kilometres)
+        kilometres[~measured] = 0.0
+        counts = {}
+        distances = {}
+        for name, positions in cls.CATEGORIES:
+            values = np.concatenate([np.array(columns[position], dtype=str)
+                                     for position in positions])
+            keys, inverse, tallies = np.unique(values, return_inverse=True,
+                                               return_counts=True)
+            sums = np.bincount(inverse.ravel(),
+                               weights=np.tile(kilometres, len(positions)),
+                               minlength=len(keys))
+            counted = keys != ''
+            counts[name] = dict(zip(keys[counted].tolist(),
+                                    tallies[counted].tolist()))
+            distances[name] = dict(zip(keys[counted].tolist(),
+                                       sums[counted].tolist()))
+        return LogbookStatistics(len(durations), int(durations.sum()),
+                                 int(durations.max()), counts,
+                                 int(measured.sum()), float(kilometres.sum()),
+                                 float(kilometres.max()), distances)
+
+    @classmethod
+    def check_rollups(cls, store, repair=True):
+        """Checks the store's statistics rollups against flight_data.
+
+           The statistics are recomputed from scratch and compared with the
+           stored totals and counters.
+
+           Args:
+               store: The FlightStore to check.
+               repair: Whether inconsistent rollups are rebuilt.
+
+           Returns True if the rollups were consistent."""
+        statistics = cls.compute(store)
+        rollups = store.read_rollups()
+
+        # running distance sums may drift from a fresh sum by rounding errors
+        consistent = (rollups[:5] == statistics[:5] and
+                      np.isclose(rollups.total_km, statistics.total_km) and
+                      np.isclose(rollups.longest_km, statistics.longest_km))
+        for name, _ in cls.CATEGORIES:
+            stored = rollups.distances[name]
+            computed = statistics.distances[name]
+            consistent = consistent and stored.keys() == computed.keys() and \
+                all(np.isclose(stored[value], computed[value])
+                    for value in stored)
+        if not consistent and repair:
+            store.repair_statistics()
+        return consistent
+
+
 # Statistics tab class ---------------------------------------------------------
 
 
@@ -276,11 +2034,16 @@ class StatisticsTab(tk.Frame):
        program's statistics tab, displaying useful database information to
        the user."""
 
+    POLL_INTERVAL = 50  # milliseconds between checks for worker results
+
     def __init__(self, master=None):
         """Initializes the tab's tk.Frame object, sets an image constant and
            launches tab build command."""
         super().__init__()
         self.exitimage = tk.PhotoImage(file='data/icons/tab_delete.png')
+        self.results = queue.Queue()
+        self.worker = None
+        self.refresh_pending = False
         self.build()
 
     def build(self):
@@ -399,6 +2162,53 @@ class StatisticsTab(tk.Frame):
                                        disabledforeground="black")
         self.entry_top_city.grid(row=5, column=4, sticky="w")
 
+        # create and grid total distance flown field
+        self.label_distance = tk.Label(self.label_frame_stats,
+                                       text="Distance flown:")
+        self.label_distance.grid(row=6, column=0, sticky="w")
+        self.entry_distance = tk.Entry(self.label_frame_stats, width=15,
+                                       state=tk.DISABLED,
+                                       disabledforeground="black")
+        self.entry_distance.grid(row=6, column=1, sticky="w")
+
+        # create and grid average sector length field
+        self.label_average_sector = tk.Label(self.label_frame_stats,
+                                             text="Average sector:")
+        self.label_average_sector.grid(row=6, column=3, sticky="w")
+        self.entry_average_sector = tk.Entry(self.label_frame_stats, width=15,
+                                             state=tk.DISABLED,
+                                             disabledforeground="black")
+        self.entry_average_sector.grid(row=6, column=4, sticky="w")
+
+        # create and grid longest route field
+        self.label_longest_route = tk.Label(self.label_frame_stats,
+                                            text="Longest route:")
+        self.label_longest_route.grid(row=7, column=0, sticky="w")
+        self.entry_longest_route = tk.Entry(self.label_frame_stats, width=15,
+                                            state=tk.DISABLED,
+                                            disabledforeground="black")
+        self.entry_longest_route.grid(row=7, column=1, sticky="w")
+
+        # create and grid carrier with most distance flown field
+        self.label_carrier_distance = tk.Label(self.label_frame_stats,
+                                               text="Top carrier by distance:")
+        self.label_carrier_distance.grid(row=7, column=3, sticky="w")
+        self.entry_carrier_distance = tk.Entry(self.label_frame_stats,
+                                               width=15,
+                                               state=tk.DISABLED,
+                                               disabledforeground="black")
+        self.entry_carrier_distance.grid(row=7, column=4, sticky="w")
+
+        # create and grid aircraft with most distance flown field
+        self.label_aircraft_distance = tk.Label(
+            self.label_frame_stats, text="Top aircraft by distance:")
+        self.label_aircraft_distance.grid(row=8, column=3, sticky="w")
+        self.entry_aircraft_distance = tk.Entry(self.label_frame_stats,
+                                                width=15,
+                                                state=tk.DISABLED,
+                                                disabledforeground="black")
+        self.entry_aircraft_distance.grid(row=8, column=4, sticky="w")
+
         # give padding to all widgets
         for child in self.label_frame_stats.winfo_children():
             child.grid_configure(padx=1, pady=1)
@@ -407,391 +2217,1061 @@ class StatisticsTab(tk.Frame):
         self.update_data()
 
     def update_data(self):
-        """ Uploads/refreshes new Data on current flight Data labelframe """
-        # set up database
-        database = sqlite3.connect('data/database.kr')
-        cursor = database.cursor()
+        """Requests a refresh of the statistics shown on the tab.
+
+           The statistics are read on a worker thread and handed back to the
+           Tk main thread through a queue polled with after(), so the window
+           stays responsive while they are computed. Requests made while a
+           refresh is running are coalesced into a single follow-up refresh."""
+        if self.worker is not None:
+            self.refresh_pending = True
+            return
+        self.fill_entries(['computing...'] * len(self.entries()))
+        self.worker = Thread(target=self.read_statistics, daemon=True)
+        self.worker.start()
+        self.after(self.POLL_INTERVAL, self.poll_statistics)
+
+    def read_statistics(self):
+        """Reads the statistics and queues the result; runs on the worker."""
+        try:
+            self.results.put(kerosene.store.read_statistics())
+        except sqlite3.Error as error:
+            self.results.put(error)
+
+    def poll_statistics(self):
+        """Displays the worker's result once it is ready.
 
-        # enable statistics tab entry fields
-        self.entry_total_logs.config(state="normal")
-        self.entry_flight_hours.config(state="normal")
-        self.entry_average_time.config(state="normal")
-        self.entry_top_destination.config(state="normal")
-        self.entry_airports_visited.config(state="normal")
-        self.entry_top_carrier.config(state="normal")
-        self.entry_longest_flight.config(state="normal")
-        self.entry_year_most_travelled.config(state="normal")
-        self.entry_top_aircraft.config(state="normal")
-        self.entry_cities_visited.config(state="normal")
-        self.entry_top_city.config(state="normal")
-
-        # empty statistics tab entry fields
-        self.entry_total_logs.delete(0, tk.END)
-        self.entry_flight_hours.delete(0, tk.END)
-        self.entry_average_time.delete(0, tk.END)
-        self.entry_top_destination.delete(0, tk.END)
-        self.entry_airports_visited.delete(0, tk.END)
-        self.entry_top_carrier.delete(0, tk.END)
-        self.entry_longest_flight.delete(0, tk.END)
-        self.entry_year_most_travelled.delete(0, tk.END)
-        self.entry_top_aircraft.delete(0, tk.END)
-        self.entry_cities_visited.delete(0, tk.END)
-        self.entry_top_city.delete(0, tk.END)
-
-        # reset database panel variables
-        no_hours = dt.timedelta(hours=0, minutes=0, seconds=0)  # dummy time
-        self.total_flights_logged = 0
-        self.number_of_airports = 0
-        self.no_of_cities = 0
-        self.average_flight_time = no_hours
-        self.total_flight_hours = no_hours
-        self.longest_flight = no_hours
-        self.favourite_airport = ""
-        self.year_most_flown = ""
-        self.top_carrier = ""
-        self.top_plane = ""
-        self.top_city = ""
-
-        # Data extraction and re-calculation algorithms ------------------------
+           A coalesced refresh request is served before anything is shown, as
+           the result read by the worker may already be out of date."""
+        if not self.winfo_exists():
+            return
         try:
-            flight_hours = dt.timedelta(hours=0, minutes=0, seconds=0)
-            longest = dt.timedelta(hours=0, minutes=0, seconds=0)
-            airports_visited = []
-            carrier_list = []
-            planes_list = []
-            cities_list = []
-            years_list = []
-            form = "%H:%M:%S"
-            for flight in cursor.execute('''SELECT * FROM flight_data'''):
-
-                # convert flight_duration database field to timedelta object
-                # and add to total flight hours timedelta object
-                flight_duration = self.string_to_timedelta(flight[5])
-                flight_hours += flight_duration
-
-                date = flight[0][:4]  # strip off day and month, keep only year
-                years_list.append(date)
-                carrier_list.append(flight[8])
-                planes_list.append(flight[2])
-                city = flight[13]
-                city_2 = flight[14]
-                self.total_flights_logged += 1
-                if flight_duration > longest:
-                    longest = flight_duration
-                if city not in cities_list:  # avoids double counting cities
-                    cities_list.append(city)
-                    self.no_of_cities += 1
-                if city_2 not in cities_list:  # avoids double counting cities
-                    cities_list.append(city_2)
-                    self.no_of_cities += 1
-
-            # chained list comprehension including both departure airport and 
-            # destination airport lists
-            deps_des = chain([flight[6] for flight in
-                              cursor.execute('''SELECT * FROM flight_data''')],
-                             [flight[7] for flight in
-                              cursor.execute('''SELECT * FROM flight_data''')])
-
-            # chained list comprehension containing both departure city and
-            # destination city lists
-            cities = chain([flight[13] for flight in
-                            cursor.execute('''SELECT * FROM flight_data''')],
-                           [flight[14] for flight in
-                            cursor.execute('''SELECT * FROM flight_data''')])
-
-            # find most common data
-            count = Counter(deps_des)
-            top_of_count = count.most_common(1)
-            self.favourite_airport = str(top_of_count[0][0])
-            count_carriers = Counter(carrier_list)
-            top_carrier = count_carriers.most_common(1)
-            self.top_carrier = str(top_carrier[0][0])
-            count_cities = Counter(cities)
-            top_city = count_cities.most_common(1)
-            self.top_city = str(top_city[0][0])
-            count_plane_models = Counter(planes_list)
-            top_plane = count_plane_models.most_common(1)
-            self.top_plane = str(top_plane[0][0])
-            count_years = Counter(years_list)
-            top_year = count_years.most_common(1)
-            self.year_most_flown = str(top_year[0][0])
-
-            # calculate average flight time
-            self.average_flight_time = str(flight_hours //
-                                           self.total_flights_logged)
-            flight_hours = self.format_timedelta(flight_hours)
-            self.total_flight_hours = str(flight_hours)
-            self.number_of_airports = str(self.total_flights_logged * 2)
-            self.longest_flight = str(longest)
-
-            # free up memory
-            del flight_hours
-            del airports_visited[:]
-            del carrier_list[:]
-            del planes_list[:]
-            del cities_list[:]
-            del years_list[:]
-
-        except IndexError:
-            pass
+            result = self.results.get_nowait()
+        except queue.Empty:
+            self.after(self.POLL_INTERVAL, self.poll_statistics)
+            return
+        self.worker = None
+        if self.refresh_pending:
+            self.refresh_pending = False
+            self.update_data()
+        else:
+            self.show_statistics(result)
 
-        finally:
-            # Update widgets
-            self.entry_total_logs.insert(0, str(self.total_flights_logged))
-            self.entry_flight_hours.insert(0, str(self.total_flight_hours))
-            self.entry_average_time.insert(0, str(self.average_flight_time))
-            self.entry_top_destination.insert(0, self.favourite_airport)
-            self.entry_airports_visited.insert(0, self.number_of_airports)
-            self.entry_top_carrier.insert(0, self.top_carrier)
-            self.entry_longest_flight.insert(0, self.longest_flight)
-            self.entry_year_most_travelled.insert(0, self.year_most_flown)
-            self.entry_top_aircraft.insert(0, self.top_plane)
-            self.entry_cities_visited.insert(0, self.no_of_cities)
-            self.entry_top_city.insert(0, self.top_city)
-
-            # disable statistics tab entry fields
-            self.entry_total_logs.config(state="disabled")
-            self.entry_flight_hours.config(state="disabled")
-            self.entry_average_time.config(state="disabled")
-            self.entry_top_destination.config(state="disabled")
-            self.entry_airports_visited.config(state="disabled")
-            self.entry_top_carrier.config(state="disabled")
-            self.entry_longest_flight.config(state="disabled")
-            self.entry_year_most_travelled.config(state="disabled")
-            self.entry_top_aircraft.config(state="disabled")
-            self.entry_cities_visited.config(state="disabled")
-            self.entry_top_city.config(state="disabled")
-
-            # close database and update status
-            database.close()
-            kerosene.label_status['text'] = "Idle..."
+    def show_statistics(self, statistics):
+        """Fills the entry fields with a LogbookSummary.
+
+           Args:
+               statistics: The LogbookSummary to show, or the sqlite3.Error
+                           raised while reading it."""
+        no_hours = format_duration(0)  # dummy time
+        no_distance = format_distance(0)
+        values = [0, no_hours, no_hours, "", "0", "", no_hours, "", "", 0, "",
+                  no_distance, no_distance, no_distance, "", ""]
+        if isinstance(statistics, sqlite3.Error):
+            box.showwarning('Error', 'Oops, something went wrong!'
+                                     '\nThe database appears not'
+                                     '\nto be working properly.')
+        elif statistics.flights:
+            values = [statistics.flights,
+                      format_duration(statistics.total_seconds),
+                      format_duration(statistics.total_seconds //
+                                      statistics.flights),
+                      statistics.top['airport'],
+                      str(statistics.flights * 2),
+                      statistics.top['carrier'],
+                      format_duration(statistics.longest_seconds),
+                      statistics.top['year'],
+                      statistics.top['aircraft'],
+                      statistics.cities,
+                      statistics.top['city'],
+                      format_distance(statistics.total_km),
+                      format_distance(statistics.total_km /
+                                      max(statistics.sectors, 1)),
+                      format_distance(statistics.longest_km),
+                      statistics.top_distance['carrier'],
+                      statistics.top_distance['aircraft']]
+        self.fill_entries(values)
+
+    def entries(self):
+        """Returns the tab's entry fields, in the order fill_entries uses."""
+        return (self.entry_total_logs, self.entry_flight_hours,
+                self.entry_average_time, self.entry_top_destination,
+                self.entry_airports_visited, self.entry_top_carrier,
+                self.entry_longest_flight, self.entry_year_most_travelled,
+                self.entry_top_aircraft, self.entry_cities_visited,
+                self.entry_top_city, self.entry_distance,
+                self.entry_average_sector, self.entry_longest_route,
+                self.entry_carrier_distance, self.entry_aircraft_distance)
+
+    def fill_entries(self, values):
+        """Replaces the text of the tab's read-only entry fields.
+
+           Args:
+               values: One value per entry field, ordered as in entries."""
+        for entry, value in zip(self.entries(), values):
+            entry.config(state="normal")
+            entry.delete(0, tk.END)
+            entry.insert(0, str(value))
+            entry.config(state="disabled")
 
     def close_tab(self):
         """Destroys statistics tab and re-enables the statistics menu option."""
         self.destroy()
         kerosene.enable_menu_statistics()
 
+
+# Base map cache ---------------------------------------------------------------
+
+
+class MapGeometry(object):
+    """Projected base map geometry written by build_map_geometry.
+
+       Projects coordinates and draws the base map with NumPy and a handful of
+       Matplotlib collections, so that Basemap and its shapefile data are not
+       needed while the program runs. Instances are callable like a Basemap
+       and have the same llcrnrx, urcrnrx, llcrnry and urcrnry attributes.
+
+       Finer coastlines and borders for zoomed-in views are read from the
+       file one tile at a time, when first needed, and the most recently
+       used DETAIL_TILES_KEPT tiles kept in memory."""
+
+    LAYERS = ('coastlines', 'countries', 'continents', 'lakes', 'graticule',
+              'boundary')
+
+    def __init__(self, arrays, path=None):
+        """Unpacks the arrays of a geometry file.
+
+           Args:
+               arrays: A mapping of the arrays saved by build_map_geometry.
+               path: The file detail tiles are read from, if any."""
+        self.path = path
+        self.tiles = OrderedDict()
+        self.lock = RLock()
+        self.lon_0 = MAP_PROJECTION['lon_0']
+        self.llcrnrx, self.urcrnrx, self.llcrnry, self.urcrnry = \
+            arrays['extent'].tolist()
+        self.latitudes = arrays['latitudes']
+        self.centre = arrays['centre']
+        self.scale = arrays['scale']
+        self.heights = arrays['heights']
+        self.layers = {}
+        for name in self.LAYERS:
+            self.layers[name] = np.split(arrays[name + '_vertices'],
+                                         arrays[name + '_offsets'][1:-1])
+
+    @classmethod
+    def load(cls, path=GEOMETRY_PATH):
+        """Returns the geometry stored at path, or None if the file is
+           missing, unreadable or was built for another projection."""
+        try:
+            with np.load(path) as arrays:
+                if str(arrays['projection']) != projection_key():
+                    return None
+                return cls(arrays, path)
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def __call__(self, longitudes, latitudes):
+        """Returns the projected x and y of coordinates given in degrees."""
+        latitudes = np.asarray(latitudes, dtype=float)
+        offsets = (np.asarray(longitudes, dtype=float) - self.lon_0 +
+                   180) % 360 - 180
+        x = (np.interp(latitudes, self.latitudes, self.centre) +
+             np.interp(latitudes, self.latitudes, self.scale) * offsets)
+        return x, np.interp(latitudes, self.latitudes, self.heights)
+
+    def detail_level(self, width):
+        """Returns the DETAIL_LEVELS resolution for a view width, or None if
+           the base geometry is detailed enough."""
+        level = None
+        for resolution, share in DETAIL_LEVELS:
+            if width < share * (self.urcrnrx - self.llcrnrx):
+                level = resolution
+        return level
+
+    def tiles_in_view(self, x_min, x_max, y_min, y_max):
+        """Returns the indices of the detail tiles overlapping a view."""
+        columns, rows = DETAIL_TILES
+        width = self.urcrnrx - self.llcrnrx
+        height = self.urcrnry - self.llcrnry
+        first_column, last_column = (
+            min(max(int((x - self.llcrnrx) / width * columns), 0), columns - 1)
+            for x in (x_min, x_max))
+        first_row, last_row = (
+            min(max(int((y - self.llcrnry) / height * rows), 0), rows - 1)
+            for y in (y_min, y_max))
+        return [row * columns + column
+                for row in range(first_row, last_row + 1)
+                for column in range(first_column, last_column + 1)]
+
+    def detail(self, layer, resolution, tiles):
+        """Returns the polylines of a layer at a finer resolution.
+
+           Args:
+               layer: 'coastlines' or 'countries'.
+               resolution: One of the DETAIL_LEVELS resolutions.
+               tiles: Indices of the tiles to read, from tiles_in_view."""
+        polylines = []
+        with self.lock:
+            missing = [tile for tile in tiles
+                       if (layer, resolution, tile) not in self.tiles]
+            if missing:
+                self.read_tiles(layer, resolution, missing)
+            for tile in tiles:
+                key = (layer, resolution, tile)
+                self.tiles.move_to_end(key)
+                polylines.extend(self.tiles[key])
+            while len(self.tiles) > DETAIL_TILES_KEPT:
+                self.tiles.popitem(last=False)
+        return polylines
+
+    def read_tiles(self, layer, resolution, tiles):
+        """Reads detail tiles from the geometry file into the tile cache."""
+        try:
+            with np.load(self.path) as arrays:
+                for tile in tiles:
+                    name = '{}_{}_{:d}'.format(layer, resolution, tile)
+                    polylines = []
+                    if name + '_vertices' in arrays.files:
+                        polylines = np.split(arrays[name + '_vertices'],
+                                             arrays[name + '_offsets'][1:-1])
+                    self.tiles[(layer, resolution, tile)] = polylines
+        except (OSError, TypeError, ValueError):  # no detail available
+            for tile in tiles:
+                self.tiles[(layer, resolution, tile)] = []
+
+    def draw(self, ax):
+        """Draws the base map into ax, one collection per layer."""
+        ax.add_collection(PolyCollection(
+            self.layers['boundary'], facecolors=MAP_STYLE['water'],
+            edgecolors='none', zorder=0))
+        ax.add_collection(PolyCollection(
+            self.layers['continents'], facecolors=MAP_STYLE['continents'],
+            edgecolors='none', zorder=1))
+        ax.add_collection(PolyCollection(
+            self.layers['lakes'], facecolors=MAP_STYLE['water'],
+            edgecolors='none', zorder=1))
+        ax.add_collection(LineCollection(
+            self.layers['countries'], colors=MAP_STYLE['countries'],
+            zorder=2))
+        ax.add_collection(LineCollection(
+            self.layers['coastlines'], colors=MAP_STYLE['coastlines'],
+            linewidths=MAP_STYLE['coastline_width'], zorder=3))
+        ax.add_collection(LineCollection(
+            self.layers['graticule'], colors=MAP_STYLE['graticule'],
+            linestyles=[(0, (1, 1))], zorder=4))
+        ax.add_collection(LineCollection(
+            self.layers['boundary'], colors=MAP_STYLE['boundary'],
+            linewidths=MAP_STYLE['boundary_width'], zorder=5))
+
+
+class BaseMapCache(object):
+    """Base map shared by the route and airport map tabs.
+
+       The base map is drawn from the prebuilt MapGeometry file when it
+       matches MAP_PROJECTION, without importing Basemap. Otherwise a Basemap
+       is built instead: drawing its coastlines, countries and continents
+       takes seconds, so the pickled (Basemap, Figure) pair is kept in memory
+       once built and in MAP_CACHE_DIR between runs. The file name holds a
+       digest of the projection, the style and the library versions, so
+       changing any of them builds a new map instead of loading a stale or
+       incompatible one. The map is prepared on a background thread started
+       by load(), or when it is first needed if it was never started.
+
+       The projection and the base map figure are shared by every tab. The
+       figure is only ever rendered to raster backgrounds, cached per size,
+       which the tabs show as a single image under their overlay artists."""
+
+    # number of background rasters kept, one per canvas size
+    BACKGROUNDS_KEPT = 4
+
+    def __init__(self, directory=MAP_CACHE_DIR, geometry_path=GEOMETRY_PATH):
+        """Sets the cache directory and the geometry file path. Nothing is
+           loaded yet."""
+        self.directory = directory
+        self.geometry_path = geometry_path
+        self.geometry = None
+        self.geometry_checked = False
+        self.data = None
+        self.basemap = None
+        self.base_figure = None
+        self.backgrounds = OrderedDict()
+        self.lock = RLock()
+        self.loaded = Event()
+        self.thread = None
+
+    def load(self):
+        """Starts preparing the base map on a background thread."""
+        self.loaded.clear()
+        self.thread = Thread(target=self.prepare, daemon=True)
+        self.thread.start()
+
+    def prepare(self):
+        """Reads or builds the base map. Runs on the loader thread."""
+        try:
+            self.figure()
+        except Exception:  # get() raises it again when a map is requested
+            pass
+        finally:
+            self.loaded.set()
+
+    def is_ready(self):
+        """Returns True if get() will not have to wait for the base map."""
+        return self.base_figure is not None or self.loaded.is_set()
+
     @staticmethod
-    def string_to_timedelta(string=''):
-        """This function converts datetime string representations saved in
-        the database."""
-        split_string = string.split(':')
-        converted_string = dt.timedelta(hours=int(split_string[0]),
-                                        minutes=int(split_string[1]),
-                                        seconds=int(split_string[2]))
-        return converted_string
+    def cache_key():
+        """Returns a digest of every input the base map depends on."""
+        from mpl_toolkits.basemap import __version__ as basemap_version
+        inputs = (sorted(MAP_PROJECTION.items()), sorted(MAP_STYLE.items()),
+                  MAP_FIGURE_SIZE, matplotlib.__version__, basemap_version,
+                  np.__version__, sys.version_info[:2], pickle.HIGHEST_PROTOCOL)
+        return hashlib.sha1(repr(inputs).encode()).hexdigest()[:16]
+
+    @property
+    def path(self):
+        """Path of the cache file matching the current cache key."""
+        return os.path.join(self.directory,
+                            'basemap-{}.pickle'.format(self.cache_key()))
+
+    def get(self):
+        """Returns the pickled base map, reading or building it if needed."""
+        with self.lock:
+            if self.data is None:
+                self.data = self.read()
+            if self.data is None:
+                self.data = self.build()
+                self.write(self.data)
+            return self.data
+
+    def unpickled(self):
+        """Returns the shared (Basemap, Figure) pair, unpickling it once."""
+        with self.lock:
+            if self.basemap is None:
+                self.basemap = pickle.loads(self.get())
+            return self.basemap
+
+    def map_geometry(self):
+        """Returns the prebuilt MapGeometry, or None if it can't be used."""
+        with self.lock:
+            if not self.geometry_checked:
+                self.geometry = MapGeometry.load(self.geometry_path)
+                self.geometry_checked = True
+            return self.geometry
+
+    def projection(self):
+        """Returns the MapGeometry, or the Basemap if there is none, that
+           projects (longitude, latitude) coordinates."""
+        geometry = self.map_geometry()
+        if geometry is not None:
+            return geometry
+        return self.unpickled()[0]
+
+    def figure(self):
+        """Returns the figure the base map rasters are rendered from."""
+        with self.lock:
+            if self.base_figure is None:
+                geometry = self.map_geometry()
+                if geometry is None:
+                    self.base_figure = self.unpickled()[1]
+                else:
+                    self.base_figure = Figure(figsize=MAP_FIGURE_SIZE)
+                    self.base_figure.patch.set_facecolor(
+                        MAP_STYLE['background'])
+                    geometry.draw(self.base_figure.add_subplot(111))
+            return self.base_figure
+
+    def extent(self):
+        """Returns the (x_min, x_max, y_min, y_max) projected map extent."""
+        m = self.projection()
+        return m.llcrnrx, m.urcrnrx, m.llcrnry, m.urcrnry
+
+    def background(self, width, height):
+        """Returns the base map rendered to a height x width RGBA array.
+
+           The map fills the whole array, so the image can be shown with
+           extent() as its extent. Rasters are cached per size."""
+        key = (width, height)
+        with self.lock:
+            if key in self.backgrounds:
+                self.backgrounds.move_to_end(key)
+                return self.backgrounds[key]
+            fig = self.figure()
+            ax = fig.axes[0]
+            x_min, x_max, y_min, y_max = self.extent()
+            ax.set_position([0, 0, 1, 1])
+            ax.set_aspect('auto')
+            ax.set_axis_off()
+            ax.set_xlim(x_min, x_max)
+            ax.set_ylim(y_min, y_max)
+            fig.set_size_inches(width / fig.dpi, height / fig.dpi)
+            canvas = FigureCanvasAgg(fig)
+            canvas.draw()
+            columns, rows = canvas.get_width_height()
+            raster = np.frombuffer(canvas.buffer_rgba(), dtype=np.uint8)
+            self.backgrounds[key] = raster.reshape(rows, columns, 4).copy()
+            while len(self.backgrounds) > self.BACKGROUNDS_KEPT:
+                self.backgrounds.popitem(last=False)
+            return self.backgrounds[key]
+
+    def read(self):
+        """Returns the cached base map stored on disk, or None."""
+        try:
+            with open(self.path, 'rb') as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def write(self, data):
+        """Stores data as the cached base map and removes stale copies.
+
+           The file is written under a temporary name and then renamed, so an
+           interrupted write never leaves a truncated map behind. A cache
+           directory that cannot be written to is silently ignored."""
+        path = self.path
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + '.tmp', 'wb') as file:
+                file.write(data)
+            os.replace(path + '.tmp', path)
+            for name in os.listdir(self.directory):
+                stale = os.path.join(self.directory, name)
+                if name.startswith('basemap-') and stale != path:
+                    os.remove(stale)
+        except OSError:
+            pass
 
     @staticmethod
-    def format_timedelta(time_to_format):
-        """Formats timedelta objects to display time in a
-        HOURS:MINUTES:SECONDS format."""
-        minutes, seconds = divmod(time_to_format.seconds +
-                                  time_to_format.days * 86400, 60)
-        hours, minutes = divmod(minutes, 60)
-        return '{:d}:{:02d}:{:02d}'.format(hours, minutes, seconds)
+    def build():
+        """Draws the base map and returns the pickled (Basemap, Figure)."""
+        from mpl_toolkits.basemap import Basemap
+        matplotlib.use('TkAgg')
+        fig = Figure(figsize=MAP_FIGURE_SIZE)
 
+        # set map background color
+        fig.patch.set_facecolor(MAP_STYLE['background'])
 
-# Routemap tab class -----------------------------------------------------------
+        ax1 = fig.add_subplot(111)
+        m = Basemap(ax=ax1, **MAP_PROJECTION)
 
+        # build map and adjust settings
+        m.drawcoastlines(linewidth=MAP_STYLE['coastline_width'],
+                         color=MAP_STYLE['coastlines'])
+        m.drawcountries(color=MAP_STYLE['countries'])
+        m.fillcontinents(color=MAP_STYLE['continents'],
+                         lake_color=MAP_STYLE['water'])
+        m.drawmapboundary(linewidth=MAP_STYLE['boundary_width'],
+                          color=MAP_STYLE['boundary'],
+                          fill_color=MAP_STYLE['water'])
+        m.drawmeridians(np.arange(0, 360, 30), color=MAP_STYLE['graticule'])
+        m.drawparallels(np.arange(-90, 90, 30), color=MAP_STYLE['graticule'])
 
-class RoutemapTab(tk.Frame):
-    """Creates and manages Matplotlib plotting tab.
+        return pickle.dumps((m, fig))
 
-       This class creates and manages the program's tab responsible for plotting
-       flight routes or airports visited on a Matplotlib map and displaying the
-       results to the user.
 
-       WARNING: The routes plotted on Matplotlib's maps are not the actual
-                navigation routes followed by the plane during flight. They are
-                simply a great circle visual representation connecting the
-                flight's departure and destination airports."""
+class RouteGeometryCache(object):
+    """Projected great circles of the routes flown, kept between runs.
 
-    def __init__(self, master=None, key=None, is_route=True, is_pickled=None):
-        """Initializes the tab's underlying tk.Frame object and sets constants.
+       Routes are keyed by their (iata_dep, iata_des) pair and stored in the
+       flight database's route_geometry table, tagged with key(): rows
+       computed for another projection or number of points are ignored and
+       replaced as routes are drawn again. A cached route whose endpoint
+       coordinates changed is computed again too.
 
-           This initialization function carries out an important task besides
-           invoking super() and setting constants. Based on the user's menu
-           selection recorded in the is_route argument it pulls the appropriate
-           data from the database for either plotting individual flight route
-           data or displaying all visited airports on the map.
+       Great circles are stored whole, as projected, and split where they
+       cross the edge of the map every time they are drawn, so cached routes
+       crossing the antimeridian are drawn exactly like fresh ones. The table
+       is read once, then served from memory."""
 
-           Args:
-               key: The flight record's database key, used to retrieve the
-                    flight's departure and destination airport latitude and
-                    longitude.
-               is_route: If True the initialization method pulls the flight
-                         flight record's latitude and longitude data. If False
-                          __init__ will extract latitude/longitude for all
-                          airports visited."""
-        super().__init__()
-        self.worldimage = tk.PhotoImage(file='data/icons/world_delete.png')
-        self.key = key
-        self.is_route = is_route
-        self.is_pickled = is_pickled
-        self.flight_number = ""
+    def __init__(self, store):
+        """Sets the FlightStore holding the cache. Nothing is read yet."""
+        self.store = store
+        self.routes = None
+        self.lock = RLock()
 
-        if self.is_route:  # pull latitude and longitude of a single flight record
+    @staticmethod
+    def key():
+        """Returns a string identifying the projection of cached routes."""
+        return '{} points={:d}'.format(projection_key(), GREAT_CIRCLE_POINTS)
 
-            # connect to database
-            database = sqlite3.connect('data/database.kr')
-            try:
-                cursor = database.cursor()
-                fetch_row = cursor.execute('''SELECT * FROM flight_data
-                                              WHERE date=?''', (self.key,))
-                record = fetch_row.fetchone()
+    def segments(self, m, routes):
+        """Returns the polylines of routes, as route_segments() does.
 
-                # fetch departure and destination latitude and longitude
-                self.from_latitude = float(record[11])
-                self.from_longitude = float(record[12])
-                self.to_latitude = float(record[15])
-                self.to_longitude = float(record[16])
+           Routes not cached yet are projected together, in one call, and
+           added to the cache. Routes without IATA codes are never cached.
 
-                # fetch flight number
-                self.flight_number = record[1]
+           Args:
+               m: The projection.
+               routes: Rows starting with the departure and destination IATA
+                       codes, the departure latitude and longitude and the
+                       destination latitude and longitude."""
+        key = self.key()
+        x = np.empty((len(routes), GREAT_CIRCLE_POINTS), dtype=np.float32)
+        y = np.empty_like(x)
+        with self.lock:
+            if self.routes is None:
+                try:
+                    self.routes = self.store.read_route_geometry(key)
+                except sqlite3.Error:  # draw without the cache
+                    self.routes = {}
+            missing = []
+            for index, route in enumerate(routes):
+                cached = self.routes.get(tuple(route[:2]))
+                if cached is not None and cached[0] == tuple(route[2:6]):
+                    x[index], y[index] = cached[1], cached[2]
+                else:
+                    missing.append(index)
+            if missing:
+                lat_dep, lon_dep, lat_des, lon_des = np.array(
+                    [route[2:6] for route in (routes[index]
+                                              for index in missing)],
+                    dtype=float).T
+                x[missing], y[missing] = project_great_circles(
+                    m, lon_dep, lat_dep, lon_des, lat_des)
+                added = [tuple(routes[index][:6]) + (x[index], y[index])
+                         for index in missing
+                         if routes[index][0] and routes[index][1]]
+                for route in added:
+                    self.routes[route[:2]] = (route[2:6],) + route[6:]
+                try:
+                    self.store.write_route_geometry(key, added)
+                except sqlite3.Error:  # keep the routes in memory only
+                    pass
+        return split_routes(x, y, m.urcrnrx - m.llcrnrx)
+
+
+class AirportPositions(object):
+    """Projected positions of the airports of an AirportCache.
+
+       The first lookup projects every airport with known coordinates in a
+       single vectorized call and keeps its x and y per IATA code, so later
+       lookups are dictionary reads and projection cost depends on the number
+       of airports, not of flights. Positions are projected again when the
+       projection or the content of the AirportCache changes. Airports it
+       doesn't know, or stored by flights with other coordinates, are
+       projected together on every lookup."""
+
+    def __init__(self, airports):
+        """Sets the AirportCache positions are projected from. Nothing is
+           projected yet."""
+        self.airports = airports
+        self.positions = {}
+        self.source = None
+        self.key = None
+        self.lock = RLock()
+
+    def fill(self, m):
+        """Projects every airport of the AirportCache with projection m."""
+        try:
+            self.airports.wait_loaded()
+        except sqlite3.Error:  # project airports on every lookup instead
+            pass
+        source = self.airports.airports
+        known = [(iata, airport[4], airport[3])
+                 for iata, airport in source.items()
+                 if airport[3] is not None and airport[4] is not None]
+        self.positions = {}
+        if known:
+            codes, longitudes, latitudes = zip(*known)
+            x, y = m(np.array(longitudes, dtype=float),
+                     np.array(latitudes, dtype=float))
+            self.positions = dict(zip(codes, zip(
+                longitudes, latitudes, np.asarray(x).tolist(),
+                np.asarray(y).tolist())))
+        self.source = source
+        self.key = projection_key()
+
+    def project(self, m, codes, longitudes, latitudes):
+        """Returns the projected x and y arrays of airports.
 
-            except sqlite3.Error:
-                box.showwarning('Error', 'Oops, something went wrong!'
-                                         '\nThe database appears not'
-                                         '\nto be working properly.')
-            finally:
+           Args:
+               m: The projection.
+               codes: The airports' IATA codes.
+               longitudes, latitudes: The airports' coordinates, as stored
+                                      with the flights."""
+        x = np.empty(len(codes))
+        y = np.empty(len(codes))
+        missing = []
+        with self.lock:
+            if (self.source is not self.airports.airports or
+                    self.key != projection_key()):
+                self.fill(m)
+            for index, position in enumerate(zip(codes, longitudes,
+                                                 latitudes)):
+                cached = self.positions.get(position[0])
+                if cached is not None and cached[:2] == position[1:]:
+                    x[index], y[index] = cached[2:]
+                else:
+                    missing.append(index)
+        if missing:
+            x[missing], y[missing] = m(
+                np.array([longitudes[index] for index in missing], dtype=float),
+                np.array([latitudes[index] for index in missing], dtype=float))
+        return x, y
+
+
+class MapRenderer(object):
+    """Draws route and airport maps on Matplotlib figures.
+
+       Figures are built without any Tk widget, so the same code draws the
+       maps shown in RoutemapTab and the image files written by MapExporter.
+       Overlays are projected with the projection of a shared BaseMapCache,
+       great circles read from a RouteGeometryCache and airport positions
+       from an AirportPositions, if given. Renderers only hold these shared
+       caches, so one renderer can serve every map."""
+
+    def __init__(self, base_map, route_cache=None, airport_positions=None):
+        """Sets the BaseMapCache the maps are drawn over, and the optional
+           RouteGeometryCache and AirportPositions."""
+        self.base_map = base_map
+        self.route_cache = route_cache
+        self.airport_positions = airport_positions
+
+    def new_map(self, dpi=None, vector=False):
+        """Returns a new figure, and its axes, showing the base map.
+
+           The base map is drawn as one raster image spanning the projected
+           map extent, so drawing, panning and zooming the map cost the
+           overlay artists added on top of it.
 
-                # close database
-                database.close()
+           Args:
+               dpi: Figure resolution, the Matplotlib default if None.
+               vector: Draw the base map as vector collections instead of a
+                       raster, when the prebuilt geometry is available.
 
-            # invoke method that plots the single flight route
+           Returns:
+               The projection, the figure, its axes and the background image,
+               None if the base map was drawn as vectors."""
+        m = self.base_map.projection()
+        fig = Figure(figsize=MAP_FIGURE_SIZE, dpi=dpi)
 
-            start = time.time()
-            self.build_route()
+        # set map background color
+        fig.patch.set_facecolor(MAP_STYLE['background'])
+
+        ax = fig.add_subplot(111)
+        ax.set_axis_off()
+        x_min, x_max, y_min, y_max = self.base_map.extent()
+        ax.set_xlim(x_min, x_max)
+        ax.set_ylim(y_min, y_max)
+        ax.set_aspect('equal')
+        geometry = self.base_map.map_geometry()
+        if vector and geometry is not None:
+            geometry.draw(ax)
+            return m, fig, ax, None
+        background = ax.imshow(
+            self.base_map.background(*self.background_size(ax)),
+            extent=(x_min, x_max, y_min, y_max), origin='upper',
+            interpolation='bilinear', zorder=0)
+        return m, fig, ax, background
 
-        else:  # pull latitude and longitude of all visited airports
+    @staticmethod
+    def background_size(ax):
+        """Returns the (width, height) in pixels of the map drawn in ax."""
+        ax.apply_aspect()
+        box = ax.get_position().transformed(ax.figure.transFigure)
+        return max(int(round(box.width)), 1), max(int(round(box.height)), 1)
 
-            database = sqlite3.connect('data/database.kr')
-            try:
-                cursor = database.cursor()
-
-                # chained list comprehension including both departure latitude
-                # and destination latitude
-                self.lats = chain([float(flight[11]) for flight in
-                                   cursor.execute(
-                                       '''SELECT * FROM flight_data''')],
-                                  [float(flight[15]) for flight in
-                                   cursor.execute(
-                                       '''SELECT * FROM flight_data''')])
-
-                # chained list comprehension including both departure longitude
-                # and destination longitude
-                self.lons = chain([float(flight[12]) for flight in
-                                   cursor.execute(
-                                       '''SELECT * FROM flight_data''')],
-                                  [float(flight[16]) for flight in
-                                   cursor.execute(
-                                       '''SELECT * FROM flight_data''')])
-
-                # set latitude and longitude constants
-                self.lats = tuple(self.lats)
-                self.lons = tuple(self.lons)
+    def route_segments(self, m, routes):
+        """Returns the polylines of routes and the route each belongs to.
 
-            except sqlite3.Error:
-                box.showwarning('Error', 'Oops, something went wrong!'
-                                         '\nThe database appears not'
-                                         '\nto be working properly.')
-            finally:
-                database.close()
+           Args:
+               m: The projection.
+               routes: Rows of FlightStore.list_routes(), or rows holding at
+                       least their first six columns."""
+        if self.route_cache is not None:
+            return self.route_cache.segments(m, routes)
+        lat_dep, lon_dep, lat_des, lon_des = (
+            np.array(column, dtype=float)
+            for column in list(zip(*routes))[2:6])
+        return route_segments(m, lon_dep, lat_dep, lon_des, lat_des)
+
+    def project_airports(self, m, codes, longitudes, latitudes):
+        """Returns the projected x and y arrays of airports.
 
-            # invoke method that plots all airports on the map
-            self.build_airports_map()
+           Args:
+               m: The projection.
+               codes: The airports' IATA codes.
+               longitudes, latitudes: The airports' coordinates."""
+        if self.airport_positions is not None:
+            return self.airport_positions.project(m, codes, longitudes,
+                                                  latitudes)
+        x, y = m(np.array(longitudes, dtype=float),
+                 np.array(latitudes, dtype=float))
+        return np.asarray(x), np.asarray(y)
+
+    def draw_route(self, ax, m, route):
+        """Draws one flight route.
+
+           Args:
+               ax: The map axes.
+               m: The projection.
+               route: Departure and destination IATA codes, departure
+                      latitude and longitude and destination latitude and
+                      longitude."""
+        fromlat, fromlon, tolat, tolon = route[2:6]
+
+        # mark departure and destination airports
+        x, y = self.project_airports(m, route[:2], [fromlon, tolon],
+                                     [fromlat, tolat])
+        ax.plot(x, y, 'rv', markersize=8)
+
+        # draw great circle between departure and destination, in one piece
+        # per side of the map if it crosses its edge
+        polylines, _ = self.route_segments(m, [route])
+        for polyline in polylines:
+            ax.plot(polyline[:, 0], polyline[:, 1], linewidth=2, color='r')
 
     @staticmethod
-    def build_map(is_pickled=None):
-        """Function to load pickled map; if one doesn't exist it's created."""
-        if not is_pickled:
-            matplotlib.use('TkAgg')
-            fig = Figure()
-
-            # set map background color
-            fig.patch.set_facecolor('blue')
-
-            ax1 = fig.add_subplot(111)
-            m = Basemap(projection='robin',
-                        lat_0=43.0000, lon_0=12.0000,
-                        resolution='c', area_thresh=100000,
-                        ax=ax1)
-            # build map and adjust settings
-            m.drawcoastlines(linewidth=1, color="yellow")
-            m.drawcountries(color="blue")
-            m.fillcontinents(color='blue', lake_color="blue")
-            m.drawmapboundary(linewidth=2, color="yellow", fill_color="blue")
-            m.drawmeridians(np.arange(0, 360, 30), color="yellow")
-            m.drawparallels(np.arange(-90, 90, 30), color="yellow")
-            # self.map.bluemarble()
-
-            map_pickle = pickle.dumps((m, fig))
-            return m, fig
-        else:
-            return pickle.loads(is_pickled)
+    def chunks(count, chunk_size=None):
+        """Returns slices splitting count items into chunks of chunk_size,
+           or a single slice if chunk_size is None."""
+        if chunk_size is None:
+            return [slice(0, count)]
+        return [slice(start, start + chunk_size)
+                for start in range(0, count, chunk_size)]
 
-    def build_route(self):
-        """Initializes map and plots individual flight route data"""
+    def draw_routes(self, ax, m, routes, chunk_size=None):
+        """Draws every route flown.
 
-        # initialize map
-        m, fig = self.build_map(self.is_pickled)
+           The great circles of all distinct routes are computed at once and
+           drawn as LineCollections, routes flown more often being drawn
+           wider, more opaque and last, on top of the others.
 
-        # set departure and destination latitude/longitude using __init__
-        # constants
-        fromlat = self.from_latitude
-        fromlon = self.from_longitude
-        tolat = self.to_latitude
-        tolon = self.to_longitude
+           Args:
+               ax: The map axes.
+               m: The projection.
+               routes: Rows of FlightStore.list_routes().
+               chunk_size: Number of polylines per LineCollection, all of
+                           them in one if None.
+
+           Returns:
+               The list of LineCollections added, in drawing order."""
+        if not routes:
+            return []
+        flights = np.array([route[6] for route in routes], dtype=float)
+        polylines, indices = self.route_segments(m, routes)
+
+        # weigh each polyline by how often its route was flown
+        weights = (flights / flights.max())[indices]
+        order = np.argsort(weights, kind='mergesort')
+        colors = np.tile(to_rgba('r'), (len(indices), 1))
+        colors[:, 3] = 0.25 + 0.75 * weights
+        collections = []
+        for chunk in self.chunks(len(order), chunk_size):
+            lines = order[chunk]
+            collections.append(ax.add_collection(LineCollection(
+                [polylines[line] for line in lines], colors=colors[lines],
+                linewidths=0.5 + 2 * weights[lines])))
+        return collections
+
+    def draw_airports(self, ax, airports, chunk_size=None):
+        """Draws airport positions.
+
+           Each airport is drawn once, with a marker sized and coloured by its
+           number of visits. Above HEATMAP_THRESHOLD airports the positions
+           are binned with np.histogram2d instead and drawn as a single
+           density image, so drawing time does not grow with the logbook.
 
-        # mark departure and destination airports
-        lats = [fromlat, tolat]
-        lons = [fromlon, tolon]
-        x, y = m(lons, lats)
-        m.plot(x, y, 'rv', markersize=8)
+           Args:
+               ax: The map axes.
+               airports: Rows of FlightStore.list_visited_airports().
+               chunk_size: Number of markers per scatter call, all of them in
+                           one if None.
+
+           Returns:
+               The list of artists added, in drawing order."""
+        if not airports:
+            return []
+        codes, lats, lons, visits = zip(*airports)
+        x, y = self.project_airports(self.base_map.projection(), codes, lons,
+                                     lats)
+        visits = np.array(visits, dtype=float)
+
+        # plot data, busiest airports last so they are drawn on top
+        if len(visits) > HEATMAP_THRESHOLD:
+            return [self.plot_density(ax, x, y, weights=visits)]
+        order = np.argsort(visits, kind='mergesort')
+        share = visits[order] / visits.max()
+        return [ax.scatter(x[order][chunk], y[order][chunk],
+                           s=20 + 100 * np.sqrt(share[chunk]),
+                           c=share[chunk], cmap='plasma', vmin=0, vmax=1,
+                           marker='v', edgecolors='black', linewidths=0.5,
+                           zorder=6)
+                for chunk in self.chunks(len(order), chunk_size)]
+
+    def plot_density(self, ax, x, y, weights=None):
+        """Draws projected positions as a logarithmic density heatmap.
 
-        # draw creat curcle between departure and destination
-        m.drawgreatcircle(fromlon, fromlat, tolon, tolat, linewidth=2,
-                          color='r')
+           Args:
+               ax: The map axes.
+               x, y: Projected position arrays.
+               weights: Optional number of visits of each position.
+
+           Returns:
+               The heatmap image."""
+        x_min, x_max, y_min, y_max = self.base_map.extent()
+        density, _, _ = np.histogram2d(x, y, bins=HEATMAP_BINS,
+                                       range=[[x_min, x_max], [y_min, y_max]],
+                                       weights=weights)
+        return ax.imshow(np.ma.masked_equal(np.log1p(density.T), 0),
+                         extent=(x_min, x_max, y_min, y_max), origin='lower',
+                         cmap='plasma', interpolation='nearest', alpha=0.85,
+                         zorder=1)
+
+
+# Batch map export -------------------------------------------------------------
+
+# map renderer of an export worker process, built by the first map it renders
+export_renderer = None
+
+
+def render_map_file(path, mode, data, dpi=EXPORT_DPI):
+    """Renders one map to an image file with the Agg backend.
+
+       Runs in a MapExporter worker process. The worker's base map is set up
+       when it renders its first map and reused by every later one.
+
+       Args:
+           path: The image file written, its extension giving the format.
+           mode: 'route', 'routes' or 'airports', as in RoutemapTab.
+           data: The route, the routes or the airports drawn.
+           dpi: Image resolution."""
+    global export_renderer
+    if export_renderer is None:
+        export_renderer = MapRenderer(BaseMapCache())
+    m, fig, ax, _ = export_renderer.new_map(dpi=dpi, vector=True)
+    if mode == 'route':
+        export_renderer.draw_route(ax, m, data)
+    elif mode == 'routes':
+        export_renderer.draw_routes(ax, m, data)
+    else:
+        export_renderer.draw_airports(ax, data)
+    FigureCanvasAgg(fig).print_figure(path, dpi=dpi,
+                                      facecolor=fig.get_facecolor())
+    return path
+
+
+class MapExporter(object):
+    """Writes route and airport maps to image files, without the Gui.
+
+       The maps to export are read from the database by the calling process
+       and rendered by a pool of worker processes, each drawing its maps with
+       its own MapRenderer. PNG files are rendered by Agg, SVG files keep the
+       base map as vectors."""
+
+    def __init__(self, store, directory, file_format='png', dpi=EXPORT_DPI,
+                 workers=None):
+        """Sets the export options.
 
-        # create exit button
-        self.button_quit = ttk.Button(self, image=self.worldimage,
-                                      command=self.close_tab)
-        self.button_quit.pack(side="top", fill="y", padx=2, anchor="e")
-        self.button_tip = ToolTip(self.button_quit, ["Exit", "route", "tab"])
+           Args:
+               store: The FlightStore maps are read from.
+               directory: The folder image files are written to, created if
+                          missing.
+               file_format: One of EXPORT_FORMATS.
+               dpi: Image resolution.
+               workers: Number of worker processes, one per CPU if None."""
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError('unsupported map format: ' + file_format)
+        self.store = store
+        self.directory = directory
+        self.file_format = file_format
+        self.dpi = dpi
+        self.workers = workers
+
+    def path(self, name):
+        """Returns the path of the image file called name."""
+        return os.path.join(self.directory,
+                            '{}.{}'.format(name, self.file_format))
+
+    def jobs(self, keys=(), years=(), all_routes=False):
+        """Reads the data of the maps to export.
 
-        # create canvas
-        self.canvas = FigureCanvasTkAgg(fig, master=self)
-        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1,
-                                         padx=2, pady=2)
+           Args:
+               keys: Keys of the flights whose route maps are exported.
+                     Flights without known coordinates are skipped.
+               years: Years whose airport maps are exported.
+               all_routes: Export the map of every route flown.
+
+           Returns:
+               A list of (path, mode, data) tuples, one per map."""
+        jobs = []
+        for key in keys:
+            record = self.store.get_flight(key)
+            if record is None:
+                continue
+            route = (record[9], record[10], record[11], record[12],
+                     record[15], record[16])
+            if None not in route[2:]:
+                jobs.append((self.path('route_' + key), 'route', route))
+        for year in years:
+            jobs.append((self.path('airports_{}'.format(year)), 'airports',
+                         self.store.list_visited_airports(year)))
+        if all_routes:
+            jobs.append((self.path('routes'), 'routes',
+                         self.store.list_routes()))
+        return jobs
+
+    def export(self, jobs):
+        """Renders jobs, as returned by jobs(), and returns the paths written.
+
+           Without the prebuilt geometry the Basemap base map is built and
+           cached on disk first, so workers unpickle it instead of each
+           building its own."""
+        if not jobs:
+            return []
+        os.makedirs(self.directory, exist_ok=True)
+        base_map = BaseMapCache()
+        if base_map.map_geometry() is None:
+            base_map.get()
+        paths, modes, data = zip(*jobs)
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(render_map_file, paths, modes, data,
+                                     repeat(self.dpi)))
 
-        # initialize and update custom toolbar
-        toolbar = CustomToolbar(self.canvas, self)
-        toolbar.update()
 
-        # show canvas
-        self.canvas.show()
+# Routemap tab class -----------------------------------------------------------
 
-        # noinspection PyProtectedMember
-        self.canvas._tkcanvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True,
-                                   padx=2, pady=2)
-        # update status label
-        kerosene.label_status["text"] = "Viewing route plot for flight " \
-                                        "{}".format(self.flight_number)
+# a map figure built off the main thread, waiting to be shown on a tab
+MapFigure = namedtuple('MapFigure',
+                       'figure axes background overlays status')
 
-    def build_airports_map(self):
-        # todo: convert like build map
-        """Initializes map and plots airport positions."""
-        # initialize map
-        m, fig = self.build_map(self.is_pickled)
 
-        # set airports departure and destination latitude/longitude using
-        # __init__ constants
-        lats = self.lats
-        lons = self.lons
-        x, y = m(lons, lats)
+class RoutemapTab(tk.Frame):
+    """Creates and manages Matplotlib plotting tab.
+
+       This class creates and manages the program's tab responsible for plotting
+       a flight route, every route flown or the airports visited on a
+       Matplotlib map and displaying the results to the user.
 
-        # plot data
-        m.plot(x, y, 'rv', markersize=8)
+       WARNING: The routes plotted on Matplotlib's maps are not the actual
+                navigation routes followed by the plane during flight. They are
+                simply a great circle visual representation connecting the
+                flight's departure and destination airports."""
+
+    def __init__(self, master=None, map_figure=None):
+        """Initializes the tab's underlying tk.Frame object and shows a map.
+
+           The map's figure is built beforehand by prepare(), off the main
+           thread; the tab only attaches it to a canvas.
+
+           Args:
+               map_figure: The MapFigure returned by prepare()."""
+        super().__init__()
+        self.worldimage = tk.PhotoImage(file='data/icons/world_delete.png')
+        self.background = map_figure.background
+        self.overlays = iter(map_figure.overlays)
+        self.reveal_job = None
+        self.add_detail_lines(map_figure.axes)
+        self.show_map(map_figure.figure, map_figure.status)
+        self.reveal_job = self.after(OVERLAY_CHUNK_DELAY, self.reveal_overlay)
+
+    @staticmethod
+    def prepare(renderer, store, mode='route', key=None):
+        """Reads a map's data and draws its figure.
+
+           Based on the user's menu selection recorded in the mode argument it
+           pulls the appropriate data from the database for plotting an
+           individual flight route, all routes flown or all visited airports
+           on the map. No Tk widget is touched, so this runs on a worker
+           thread; it waits for the base map if it is still being prepared.
+
+           Routes and airports are drawn in chunks of OVERLAY_CHUNK_SIZE,
+           hidden until the tab reveals them one at a time.
+
+           Args:
+               renderer: The MapRenderer drawing the map.
+               store: The FlightStore the map's data is read from.
+               mode: 'route' plots the flight stored under key, 'routes' every
+                     route flown and 'airports' all airports visited.
+               key: The flight record's database key, used to retrieve the
+                    flight's departure and destination airport latitude and
+                    longitude.
+
+           Returns:
+               A MapFigure.
+
+           Raises:
+               sqlite3.Error: The map's data could not be read."""
+        # initialize map
+        m, fig, ax, background = renderer.new_map()
+        overlays = []
+
+        if mode == 'route':  # pull latitude and longitude of one flight
+            record = store.get_flight(key)
+            renderer.draw_route(ax, m, (record[9], record[10], record[11],
+                                        record[12], record[15], record[16]))
+            status = "Viewing route plot for flight {}".format(record[1])
+
+        elif mode == 'routes':  # pull every distinct route flown
+            overlays = renderer.draw_routes(ax, m, store.list_routes(),
+                                            OVERLAY_CHUNK_SIZE)
+            status = "Viewing all routes flown on map"
+
+        else:  # pull all visited airports and their number of visits
+            overlays = renderer.draw_airports(
+                ax, store.list_visited_airports(), OVERLAY_CHUNK_SIZE)
+            status = "Viewing all airports visited on map"
+
+        for overlay in overlays:
+            overlay.set_visible(False)
+        return MapFigure(fig, ax, background, overlays, status)
+
+    def add_detail_lines(self, ax):
+        """Adds the finer coastlines and borders filled in when zooming in.
+
+           The lines are swapped by update_detail() whenever the axes limits
+           change."""
+        self.detail_lines = []
+        self.detail_view = None
+        if kerosene.base_map.map_geometry() is None:
+            return
+        for layer, width in (('countries', 1),
+                             ('coastlines', MAP_STYLE['coastline_width'])):
+            lines = LineCollection([], colors=MAP_STYLE[layer],
+                                   linewidths=width, zorder=1)
+            ax.add_collection(lines, autolim=False)
+            self.detail_lines.append((layer, lines))
+        ax.callbacks.connect('xlim_changed', self.update_detail)
+        ax.callbacks.connect('ylim_changed', self.update_detail)
+
+    def update_detail(self, ax):
+        """Swaps in the coastlines and borders matching the zoomed view.
+
+           Nothing is done unless the view's detail level or the tiles it
+           overlaps have changed."""
+        geometry = kerosene.base_map.map_geometry()
+        x_min, x_max = sorted(ax.get_xlim())
+        y_min, y_max = sorted(ax.get_ylim())
+        resolution = geometry.detail_level(x_max - x_min)
+        tiles = []
+        if resolution is not None:
+            tiles = geometry.tiles_in_view(x_min, x_max, y_min, y_max)
+        view = (resolution, tiles)
+        if view == self.detail_view:
+            return
+        self.detail_view = view
+        for layer, lines in self.detail_lines:
+            lines.set_segments(geometry.detail(layer, resolution, tiles)
+                               if resolution is not None else [])
+
+    def resize_background(self, event=None):
+        """Swaps in the base map raster matching the new canvas size."""
+        ax = self.background.axes
+        view = ax.get_xlim(), ax.get_ylim()
+        x_min, x_max, y_min, y_max = kerosene.base_map.extent()
+        ax.set_xlim(x_min, x_max)
+        ax.set_ylim(y_min, y_max)
+        self.background.set_data(kerosene.base_map.background(
+            *MapRenderer.background_size(ax)))
+        ax.set_xlim(*view[0])
+        ax.set_ylim(*view[1])
+
+    def show_map(self, fig, status):
+        """Shows fig on the tab, with an exit button and a map toolbar.
+
+           Args:
+               fig: The map figure.
+               status: Text shown on the status label."""
 
         # create exit button
         self.button_quit = ttk.Button(self, image=self.worldimage,
@@ -803,6 +3283,7 @@ class RoutemapTab(tk.Frame):
         self.canvas = FigureCanvasTkAgg(fig, master=self)
         self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1,
                                          padx=2, pady=2)
+        self.canvas.mpl_connect('resize_event', self.resize_background)
 
         # initialize and update custom toolbar
         toolbar = CustomToolbar(self.canvas, self)
@@ -816,10 +3297,29 @@ class RoutemapTab(tk.Frame):
                                    padx=2, pady=2)
 
         # update status label
-        kerosene.label_status["text"] = "Viewing all airports visited on map"
+        kerosene.label_status["text"] = status
+
+    def reveal_overlay(self):
+        """Draws the next hidden overlay chunk and schedules the following one.
+
+           Only the new chunk is rendered, on top of the canvas' last image,
+           and blitted to the screen, so showing every chunk costs about as
+           much as one full draw. Full redraws, e.g. after zooming, include
+           the chunks revealed so far."""
+        overlay = next(self.overlays, None)
+        if overlay is None:
+            self.reveal_job = None
+            return
+        overlay.set_visible(True)
+        overlay.axes.draw_artist(overlay)
+        self.canvas.blit(overlay.axes.bbox)
+        self.reveal_job = self.after(OVERLAY_CHUNK_DELAY, self.reveal_overlay)
 
     def close_tab(self):
-        """Quits routemap tab."""
+        """Quits routemap tab, cancelling the drawing of its overlays."""
+        if self.reveal_job is not None:
+            self.after_cancel(self.reveal_job)
+            self.reveal_job = None
         self.destroy()
         kerosene.enable_menu_options()
         try:
@@ -874,44 +3374,23 @@ class UploaderEditorTab(tk.Frame):
 
             # extract the record's key and sanitize data to prepare for
             # insertion in edit tab fields
-            database = sqlite3.connect('data/database.kr')
-            cursor = database.cursor()
-            fetch_row = cursor.execute('''SELECT * FROM flight_data
-                                              WHERE date=?''', (self.key,))
-            record = fetch_row.fetchone()
-
-            # if database key is duplicate, extract only the first 10 characters
-            # to discard "-(VALUE)" tag appended to key. Keys are saved in a
-            # YYYY-MM-DD format. If two flights are recorded in the same date a
-            # "-(VALUE)" tag will be added to the key, e.g. 2015-05-4-(2).
-            # This duplicate tag has to be stripped away before splitting the
-            # key in year, month and day variables; otherwise the variables
-            # cannot be used to update related tab combobox widgets and will
-            # cause errors.
-            if len(record[0]) > 10:
-                _time = record[0][:10]  # cut off the duplicate flag
-
-                # in duplicate keys where the DD value is a single digit,
-                # e.g. 2015-05-4-(2), cutting off the flag will result in the
-                # string: 2015-05-4-. When splitting and unpacking the key the
-                # remaining '-' also needs to be removed to avoid causing errors
-                if _time[9] == '-':
-                    _time = time[:9]
-
-                # split and unpack key value
-                self.yr, self.mnth, self.dy = _time.split('-')
-            else:
+            record = kerosene.store.get_flight(self.key)
 
-                # split and unpack normally
-                self.yr, self.mnth, self.dy = record[0].split('-')
+            # if database key is duplicate, discard the "-(VALUE)" tag
+            # appended to key before splitting it in year, month and day
+            # variables; otherwise the variables cannot be used to update
+            # related tab combobox widgets and will cause errors.
+            self.yr, self.mnth, self.dy = split_key(record[0])[0].split('-')
 
             # set constants
             self.flight_number = record[1]
             self.plane_model = record[2]
+            # imported flights may lack take off and landing times; they are
+            # shown as 0:00:00, which the editor asks to complete on upload
             self.take_off_hour, self.take_off_minutes, self.take_off_seconds = (
-                record[3].split(':'))
+                format_duration(record[3] or 0).split(':'))
             self.landing_hour, self.landing_minutes, self.landing_seconds = (
-                record[4].split(':'))
+                format_duration(record[4] or 0).split(':'))
             self.departure = record[6]
             self.destination = record[7]
             self.carrier = record[8]
@@ -921,7 +3400,6 @@ class UploaderEditorTab(tk.Frame):
             self.longitude = record[12]
             self.city = record[13]
             self.city_2 = record[14]
-            database.close()
 
         self.build()
 
@@ -1054,7 +3532,7 @@ class UploaderEditorTab(tk.Frame):
         self.label_iata = tk.Label(self.frame_airports, text="Iata code")
         self.label_iata.grid(row=2, column=0)
         self.entry_iata = ttk.Combobox(self.frame_airports,
-                                       value=IATA_CODE_LIST,
+                                       value=kerosene.airports.iata_codes(),
                                        width=4)
         self.entry_iata.grid(row=2, column=1)
 
@@ -1112,7 +3590,7 @@ class UploaderEditorTab(tk.Frame):
         self.label_iata_2 = tk.Label(self.frame_airports, text="Iata code")
         self.label_iata_2.grid(row=4, column=0, padx=1, pady=1)
         self.entry_iata_2 = ttk.Combobox(self.frame_airports,
-                                         value=IATA_CODE_LIST,
+                                         value=kerosene.airports.iata_codes(),
                                          width=4)
         self.entry_iata_2.grid(row=4, column=1)
 
@@ -1227,9 +3705,7 @@ class UploaderEditorTab(tk.Frame):
     def database_upload(self):
         """Uploads new Data to database, asks user to confirm
             Data input before uploading"""
-        database = sqlite3.connect('data/database.kr')
         try:
-            cursor = database.cursor()
 
             # check if information has been inputted
             if not self.var_year.get() \
@@ -1264,14 +3740,7 @@ class UploaderEditorTab(tk.Frame):
 
                 # check for database key duplicates and, if found, generate a
                 # duplicate key with format YY-MM-DD-(VALUE)
-                dates = []
-                for saved_date in cursor.execute('SELECT date FROM '
-                                                 'flight_data ORDER BY date'):
-                    dates.append(saved_date[0])
-
-                if date in dates:
-                    count = [i for i in dates if date in i]
-                    date += "-(%d)" % len(count)
+                date = kerosene.store.allocate_key(date)
 
                 # get user inputs
                 name = self.entry_aircraft.get()
@@ -1318,44 +3787,24 @@ class UploaderEditorTab(tk.Frame):
                                  message='Flight %s'
                                          ' successfully '
                                          'added!' % number)
-                    cursor.execute("""INSERT INTO flight_data (
-                                            date,
-                                            flight_number,
-                                            plane_model,
-                                            take_off_time,
-                                            landing_time,
-                                            flight_duration,
-                                            departure,
-                                            destination,
-                                            carrier,
-                                            iata_dep,
-                                            iata_des,
-                                            latitude_dep,
-                                            longitude_dep,
-                                            city_dep,
-                                            city_des,
-                                            latitude_des,
-                                            longitude_des)
-                                            VALUES(?,?,?,?,?,?,?,?,
-                                                   ?,?,?,?,?,?,?,?,?)""",
-                                   (str(date),
-                                    str(number),
-                                    str(name),
-                                    str(take_off),
-                                    str(landing),
-                                    str(ftime),
-                                    str(start),
-                                    str(end),
-                                    str(carr),
-                                    str(iata),
-                                    str(iata_2),
-                                    str(latitude_dep),
-                                    str(longitude_dep),
-                                    str(city),
-                                    str(city_2),
-                                    str(latitude_des),
-                                    str(longitude_des)))
-                    database.commit()
+                    kerosene.store.insert(
+                        dict(date=str(date),
+                             flight_number=str(number),
+                             plane_model=str(name),
+                             take_off_time=int(take_off.total_seconds()),
+                             landing_time=int(landing.total_seconds()),
+                             flight_duration=int(ftime.total_seconds()),
+                             departure=str(start),
+                             destination=str(end),
+                             carrier=str(carr),
+                             iata_dep=str(iata),
+                             iata_des=str(iata_2),
+                             latitude_dep=parse_coordinate(latitude_dep),
+                             longitude_dep=parse_coordinate(longitude_dep),
+                             city_dep=str(city),
+                             city_des=str(city_2),
+                             latitude_des=parse_coordinate(latitude_des),
+                             longitude_des=parse_coordinate(longitude_des)))
 
                     # exit uploader tab
                     self.close_tab()
@@ -1371,15 +3820,11 @@ class UploaderEditorTab(tk.Frame):
             box.showwarning('Error', 'Oops, something went wrong!'
                                      '\nThe database appears not'
                                      '\nto be working properly.')
-        finally:
-            database.close()
 
     def upload_changes(self):
         """Uploads new Data to database, asks user to confirm
             Data input before uploading"""
-        database = sqlite3.connect('data/database.kr')
         try:
-            cursor = database.cursor()
 
             # check if information has been inputted
             if not self.var_year.get() \
@@ -1414,15 +3859,9 @@ class UploaderEditorTab(tk.Frame):
                 date = "%s-%s-%s" % (yr, mon, d)
 
                 # check for database key duplicates and, if found, generate a
-                # duplicate key with format YY-MM-DD-(VALUE)
-                dates = []
-                for saved_date in cursor.execute('SELECT date FROM '
-                                                 'flight_data ORDER BY date'):
-                    dates.append(saved_date[0])
-
-                if date in dates:
-                    count = [i for i in dates if date in i]
-                    date += "-(%d)" % len(count)
+                # duplicate key with format YY-MM-DD-(VALUE); the flight keeps
+                # its key if its date has not been changed
+                date = kerosene.store.allocate_key(date, current=self.key)
 
                 # get user input
                 name = self.entry_aircraft.get()
@@ -1469,47 +3908,25 @@ class UploaderEditorTab(tk.Frame):
                                  message='Flight %s '
                                          'successfully '
                                          'updated!' % number)
-                    cursor.execute("""UPDATE flight_data SET
-                                            date = ?,
-                                            flight_number = ?,
-                                            plane_model  = ?,
-                                            take_off_time = ?,
-                                            landing_time = ?,
-                                            flight_duration = ?,
-                                            departure = ?,
-                                            destination = ?,
-                                            carrier = ?,
-                                            iata_dep = ?,
-                                            iata_des = ?,
-                                            latitude_dep = ?,
-                                            longitude_dep = ?,
-                                            city_dep = ?,
-                                            city_des = ?,
-                                            latitude_des = ?,
-                                            longitude_des = ?
-                                            WHERE date = ?""", (str(date),
-                                                                str(number),
-                                                                str(name),
-                                                                str(take_off),
-                                                                str(landing),
-                                                                str(ftime),
-                                                                str(start),
-                                                                str(end),
-                                                                str(carr),
-                                                                str(iata),
-                                                                str(iata_2),
-                                                                str(
-                                                                    latitude_dep),
-                                                                str(
-                                                                    longitude_dep),
-                                                                str(city),
-                                                                str(city_2),
-                                                                str(
-                                                                    latitude_des),
-                                                                str(
-                                                                    longitude_des),
-                                                                self.key))
-                    database.commit()
+                    kerosene.store.update(
+                        self.key,
+                        dict(date=str(date),
+                             flight_number=str(number),
+                             plane_model=str(name),
+                             take_off_time=int(take_off.total_seconds()),
+                             landing_time=int(landing.total_seconds()),
+                             flight_duration=int(ftime.total_seconds()),
+                             departure=str(start),
+                             destination=str(end),
+                             carrier=str(carr),
+                             iata_dep=str(iata),
+                             iata_des=str(iata_2),
+                             latitude_dep=parse_coordinate(latitude_dep),
+                             longitude_dep=parse_coordinate(longitude_dep),
+                             city_dep=str(city),
+                             city_des=str(city_2),
+                             latitude_des=parse_coordinate(latitude_des),
+                             longitude_des=parse_coordinate(longitude_des)))
 
                     # exit editor tab
                     self.close_tab()
@@ -1525,8 +3942,6 @@ class UploaderEditorTab(tk.Frame):
             box.showwarning('Error', 'Oops, something went wrong!'
                                      '\nThe database appears not'
                                      '\nto be working properly.')
-        finally:
-            database.close()
 
     def populate_iata_1(self, event=None):
         """Fetches IATA codes from aiports database and populates comboboxes.
@@ -1534,28 +3949,23 @@ class UploaderEditorTab(tk.Frame):
            This function is used to auto-populate the airport name
            and airport city entries in the upload tab when the user
            makes a selection in the iata code combobox. The function
-           accesses the internal airports database and retrieves the
+           looks up the internal airports cache and retrieves the
            name and city records using the iata combobox value as
            reference."""
-        database = sqlite3.connect('data/airports_data.sqlite')
         iata = self.entry_iata.get()
         self.entry_airport.delete(0, tk.END)
         self.entry_city.delete(0, tk.END)
         try:
-            command = "SELECT name, city FROM airports WHERE iata=?"
-            cursor = database.cursor()
-            fetch_row = cursor.execute(command, (iata,))
-            record = fetch_row.fetchone()
-            name, city = record[0], record[1]
-            self.entry_airport.insert(0, name)
-            self.entry_city.insert(0, city)
+            record = kerosene.airports.get(iata)
+            if record is not None:
+                name, city = record[0], record[1]
+                self.entry_airport.insert(0, name)
+                self.entry_city.insert(0, city)
         except sqlite3.Error:
             box.showwarning('Error', 'Oops, something went wrong!'
                                      '\nThe database appears not'
                                      '\nto be working properly.')
             pass
-        finally:
-            database.close()
 
     def populate_iata_2(self, event=None):
         """Fetches IATA codes from aiports database and populates comboboxes.
@@ -1564,28 +3974,23 @@ class UploaderEditorTab(tk.Frame):
             function this is also used to auto-populate the airport name
             and airport city entries in the upload tab when the user
             makes a selection in the iata code combobox. The function
-            accesses the internal airports database and retrieves the
+            looks up the internal airports cache and retrieves the
             name and city records using the iata combobox value as
             reference """
-        database = sqlite3.connect('data/airports_data.sqlite')
         iata = self.entry_iata_2.get()
         self.entry_airport_2.delete(0, tk.END)
         self.entry_city_2.delete(0, tk.END)
         try:
-            command = "SELECT name, city FROM airports WHERE iata=?"
-            cursor = database.cursor()
-            fetch_row = cursor.execute(command, (iata,))
-            record = fetch_row.fetchone()
-            name, city = record[0], record[1]
-            self.entry_airport_2.insert(0, name)
-            self.entry_city_2.insert(0, city)
+            record = kerosene.airports.get(iata)
+            if record is not None:
+                name, city = record[0], record[1]
+                self.entry_airport_2.insert(0, name)
+                self.entry_city_2.insert(0, city)
         except sqlite3.Error:
             box.showwarning('Error', 'Oops, something went wrong!'
                                      '\nThe database appears not'
                                      '\nto be working properly.')
             pass
-        finally:
-            database.close()
 
     def close_tab(self):
         """Destroys the currently opened tab and resets GUI"""
@@ -1610,32 +4015,26 @@ class UploaderEditorTab(tk.Frame):
 
     @staticmethod
     def fetch(data_type="", iata_arg=None):
-        """ Fetches latitude or longitude from airports sqlite database.
+        """ Fetches latitude or longitude from the airports cache.
 
             Args:
                 data_type: The data_type argument tells the functions whether
                            latitude or longitude data is to be returned.
                 iata_arg: takes the iata code supplied and uses it to select the
-                          appropriate data cell from the approriate row in the
-                          airports database."""
-        database = sqlite3.connect('data/airports_data.sqlite')
-        if data_type == "latitude":
-            command = "SELECT latitude FROM airports WHERE iata =?"
-        else:
-            command = "SELECT longitude FROM airports WHERE iata =?"
+                          appropriate airport in the airports cache. None is
+                          returned for unknown codes."""
         try:
-            cursor = database.cursor()
-            fetch_row = cursor.execute(command, (iata_arg,))
-            record = fetch_row.fetchone()
-            latitude = record[0]
-            return latitude
+            record = kerosene.airports.get(iata_arg)
+            if record is None:
+                return None
+            if data_type == "latitude":
+                return record[3]
+            return record[4]
         except sqlite3.Error:
             box.showwarning('Error', 'Oops, something went wrong!'
                                      '\nThe database appears not'
                                      '\nto be working properly.')
             pass
-        finally:
-            database.close()
 
 
 # Credits tool class -----------------------------------------------------------
@@ -1757,6 +4156,8 @@ class CreditsTool(tk.Toplevel):
 class Gui(tk.Frame):
     """Builds Kerosene's GUI."""
 
+    MAP_POLL_INTERVAL = 50  # milliseconds between checks for worker maps
+
     def __init__(self, master=None, *args, **kwargs):
         """Initializes main gui tk.Frame object.
 
@@ -1782,49 +4183,33 @@ class Gui(tk.Frame):
         self.helpimage = tk.PhotoImage(file='data/icons/help.png')
         self.aboutimage = tk.PhotoImage(file='data/icons/information.png')
 
-        # Check if database file exhists, if not create one
-        if os.path.exists('data/database.kr'):
-            pass
-        else:
-            database = sqlite3.connect('data/database.kr')
-            try:
-                cursor = database.cursor()
-                cursor.execute("""CREATE TABLE flight_data (date TEXT,
-                                                        flight_number TEXT,
-                                                        plane_model TEXT,
-                                                        take_off_time TEXT,
-                                                        landing_time TEXT,
-                                                        flight_duration TEXT,
-                                                        departure TEXT,
-                                                        destination TEXT,
-                                                        carrier TEXT,
-                                                        iata_dep TEXT,
-                                                        iata_des TEXT,
-                                                        latitude_dep TEXT,
-                                                        longitude_dep TEXT,
-                                                        city_dep TEXT,
-                                                        city_des TEXT,
-                                                        latitude_des TEXT,
-                                                        longitude_des TEXT)""")
-                database.commit()
-            except sqlite3.Error:
-                box.showwarning('Error', 'Oops, something went wrong!'
-                                         '\nThe database appears not'
-                                         '\nto be working properly.')
-            finally:
-                database.close()
+        # open the flight database, creating it if it doesn't exist
+        self.store = FlightStore(DATABASE_PATH, AIRPORTS_PATH)
+        try:
+            self.store.database
+        except sqlite3.Error:
+            box.showwarning('Error', 'Oops, something went wrong!'
+                                     '\nThe database appears not'
+                                     '\nto be working properly.')
 
-        # build menu, main interface widgets and cache base map
+        # build menu and main interface widgets, then prepare the base map in
+        # the background once the window is shown
         self.build_menu()
         self.build_interface()
-        self.map_pickle = self.pickle_map()
+        self.base_map = BaseMapCache()
+        self.map_renderer = MapRenderer(self.base_map,
+                                        RouteGeometryCache(self.store),
+                                        AirportPositions(self.airports))
+        self.map_results = queue.Queue()
+        self.map_worker = None
+        self.after_idle(self.base_map.load)
 
     def build_menu(self):
         """Initializes and builds program menubar."""
         self.top = tk.Menu(self)
 
         # create file menu
-        # commands: export database, import database, exit
+        # commands: export database, import database, import flights, exit
         self.file = tk.Menu(self.top, tearoff=False)
         self.file.add_command(label='Export Database', accelerator='Ctrl+E',
                               command=self.export_database,
@@ -1834,6 +4219,10 @@ class Gui(tk.Frame):
                               command=self.import_database,
                               image=self.importimage, compound=tk.LEFT,
                               underline=0)
+        self.file.add_command(label='Import Flights',
+                              command=self.import_flights,
+                              image=self.importimage, compound=tk.LEFT,
+                              underline=7)
         self.file.add_separator()
         self.file.add_command(label='Exit', command=self.quit_program,
                               underline=0)
@@ -1865,11 +4254,15 @@ class Gui(tk.Frame):
         self.view.add_separator()
 
         # create view/plot sub-menu
-        # commands: flight route, airports
+        # commands: flight route, all routes, airports
         self.plot = tk.Menu(self.view, tearoff=False)
         self.plot.add_cascade(label='Flight Route', accelerator=None,
                               image=self.worldimage, compound=tk.LEFT,
                               command=self.launch_routemap, underline=0)
+        self.plot.add_cascade(label='All Routes',
+                              image=self.worldimage, compound=tk.LEFT,
+                              command=self.launch_all_routes_map,
+                              underline=4)
         self.plot.add_cascade(label='Airports',
                               image=self.mapimage, compound=tk.LEFT,
                               command=self.launch_airport_map, underline=0)
@@ -1877,7 +4270,7 @@ class Gui(tk.Frame):
         self.top.add_cascade(label='View', menu=self.view, underline=0)
 
         # create tools menu
-        # commands: flight finder, clear fields
+        # commands: flight finder, clear fields, check statistics
         self.tools = tk.Menu(self.top, tearoff=False)
         self.tools.add_command(label='Flight Finder', command=self.find_flight,
                                image=self.findimage, compound=tk.LEFT,
@@ -1885,6 +4278,8 @@ class Gui(tk.Frame):
         self.tools.add_command(label='Clear Fields', accelerator='Ctrl+C',
                                image=self.clearimage, compound=tk.LEFT,
                                command=self.clear_fields, underline=0)
+        self.tools.add_command(label='Check Statistics',
+                               command=self.check_statistics, underline=6)
         self.tools.add_separator()
 
         # create tools/generate sub-menu
@@ -1942,12 +4337,11 @@ class Gui(tk.Frame):
                                       sticky="we")
 
         # create database key listbox and related scrollbar
-        self.key_list = tk.Listbox(self.label_frame_main, relief="sunken",
-                                   height=8, width=22, bg='white')
-        self.key_list.grid(column=0, row=1, rowspan=6, padx=0, pady=0)
         self.sbar = tk.Scrollbar(self.label_frame_main)
-        self.key_list.config(yscrollcommand=self.sbar.set)
-        self.sbar.config(command=self.key_list.yview)
+        self.key_list = KeyList(self.label_frame_main, self.store, self.sbar,
+                                relief="sunken", height=8, width=22,
+                                bg='white')
+        self.key_list.grid(column=0, row=1, rowspan=6, padx=0, pady=0)
         self.sbar.grid(column=1, row=1, rowspan=6, pady=0, sticky='wns')
 
         # create current flight data descriptor box
@@ -2067,10 +4461,16 @@ class Gui(tk.Frame):
                                      font=font_status)
         self.label_status.pack()
 
-        # update database key list, status label and fill iata list constant
+        # progress bar shown while a map is being built
+        self.progress_map = ttk.Progressbar(self.frame_status,
+                                            mode='indeterminate', length=80)
+
+        # update database key list and status label, then start loading the
+        # airports reference cache in the background
         self.populate_list()
         self.get_last_access()
-        self.build_iata_list()
+        self.airports = AirportCache(self.store)
+        self.airports.load()
 
         # Set keyboard bindings
         self.bind_all('<Control-c>', self.clear_fields)
@@ -2091,40 +4491,23 @@ class Gui(tk.Frame):
         self.key_list.bind('<Double-1>', self.view_flight_data)
 
     def populate_list(self):
-        """Populates flight date listbox."""
+        """Populates flight date listbox.
+
+           Only the first page of keys is read; KeyList reads the others as
+           the list is scrolled."""
 
         # update status label
         self.label_status['text'] = "Populating date list..."
-        self.key_list.delete(0, tk.END)
 
-        # extract list of keys from database
-        database = sqlite3.connect('data/database.kr')
+        # extract the first page of keys from database
         try:
-            cursor = database.cursor()
-            dates = []
-            pos = 0
-
-            # fill dates list
-            for date in cursor.execute('SELECT date FROM '
-                                       'flight_data ORDER BY date'):
-                dates.append(date[0])
-
-            # insert dates list contents in key listbox
-            for flight in dates:
-                self.key_list.insert(pos, flight)
-                pos += 1
-
-            # color listbox rows in alternating shades
-            for i in range(0, len(dates), 2):
-                self.key_list.itemconfig(i, background='#f0f0ff')
+            self.key_list.refresh()
 
         except sqlite3.Error:
             self.label_status['text'] = "Error..."
             box.showwarning('Error', 'Oops, something went wrong!'
                                      '\nThe database appears not'
                                      '\nto be working properly.')
-        finally:
-            database.close()
 
     def activate_fields(self):
         """Switches all main notebook entry widgets statuses to tk.NORMAL"""
@@ -2187,9 +4570,6 @@ class Gui(tk.Frame):
         # update status label
         self.label_status['text'] = "Retrieving flight data ..."
 
-        # connect to database
-        database = sqlite3.connect('data/database.kr')
-        cursor = database.cursor()
         try:
 
             # clear fields
@@ -2202,17 +4582,13 @@ class Gui(tk.Frame):
             self.entry6.delete(0, tk.END)
 
             # get user selection from inbox
-            index = self.key_list.curselection()
-            selection = self.key_list.get(index)
-            selection = str(selection)
+            selection = self.key_list.selected_key()
 
             # fetch flight data
-            fetch_row = cursor.execute('''SELECT * FROM flight_data
-                                          WHERE date=?''', (selection,))
-            record = fetch_row.fetchone()
+            record = self.store.get_flight(selection)
             self.entry1.insert(0, record[1])  # flight number
             self.entry2.insert(0, record[2])  # plane model
-            self.entry3.insert(0, record[5])  # flight duration
+            self.entry3.insert(0, format_duration(record[5]))  # duration
             self.entry4.insert(0, record[8])  # air carrier
             self.entry5.insert(0, record[6])  # departure
             self.entry6.insert(0, record[7])  # destination
@@ -2234,8 +4610,6 @@ class Gui(tk.Frame):
             box.showwarning('Error', 'Oops, something went wrong!'
                                      '\nThe database appears not'
                                      '\nto be working properly.')
-        finally:
-            database.close()
 
     def upload_flight(self, event=None):
         """ Uploads new flight data to database.
@@ -2263,9 +4637,7 @@ class Gui(tk.Frame):
         try:
 
             # get key selected by the user in the key lostbox
-            index = self.key_list.curselection()
-            selection = self.key_list.get(index)
-            selection = str(selection)
+            selection = self.key_list.selected_key()
 
             # launch tab
             self.tab_edit = UploaderEditorTab(is_uploader=False,
@@ -2297,15 +4669,10 @@ class Gui(tk.Frame):
         # update status label
         self.label_status['text'] = "Deleting flight data..."
 
-        # set-up database
-        database = sqlite3.connect('data/database.kr')
-        cursor = database.cursor()
         try:
 
             # get user selection in listbox
-            index = self.key_list.curselection()
-            selection = self.key_list.get(index)
-            selection = str(selection)
+            selection = self.key_list.selected_key()
 
             # ask delete confirmation from user
             query = box.askyesno(title='Confirm',
@@ -2326,12 +4693,9 @@ class Gui(tk.Frame):
                 self.entry4.delete(0, tk.END)
                 self.entry5.delete(0, tk.END)
                 self.entry6.delete(0, tk.END)
-                self.key_list.delete(0, tk.END)
 
                 # delete flight record
-                cursor.execute('''DELETE FROM flight_data
-                        WHERE date=?''', (selection,))
-                database.commit()
+                self.store.delete(selection)
 
                 # re-populate listbox with database keys
                 self.populate_list()
@@ -2356,7 +4720,6 @@ class Gui(tk.Frame):
             box.showwarning(title='No flight selected',
                             message='Select a flight from the keys list!')
         finally:
-            database.close()
             self.populate_list()
             try:
                 if kerosene.tab_stats.winfo_exists():
@@ -2389,11 +4752,6 @@ class Gui(tk.Frame):
     def find_flight(self, event=None):
         """ Creates a small GUI to search for database keys in key listbox."""
 
-        # set autocompletion list
-        list_for_autocompletion = ['', ]
-        for i, listbox_value in enumerate(self.key_list.get(0, tk.END)):
-            list_for_autocompletion.append(listbox_value)
-
         # create toplevel window and adjust settings
         self.find_win = tk.Toplevel()
         self.find_win.resizable(width=False, height=False)
@@ -2409,7 +4767,9 @@ class Gui(tk.Frame):
         self.search_date = tk.StringVar()
         self.search_entry = AutocompleteEntry(self.find_win, width=15,
                                               textvariable=self.search_date)
-        self.search_entry.set_completion_list(list_for_autocompletion)
+        # keys are looked up a bounded prefix at a time as the user types
+        self.search_entry.set_completion_query(
+            lambda prefix: self.store.complete_keys(prefix, FIND_COMPLETIONS))
         self.search_entry.grid(row=0, column=1, padx=0, pady=0, sticky='we')
         self.search_entry.focus_set()
         self.button = tk.Button(self.find_win, text='Search', underline=0,
@@ -2432,87 +4792,118 @@ class Gui(tk.Frame):
         # get user date
         query = self.search_date.get()
 
-        # loop through listbox keys to find database key requested
-        for i, listbox_entry in enumerate(self.key_list.get(0, tk.END), 0):
-            if listbox_entry == query:
-
-                # focus on selection and populate main tab entries with the
-                # data requested, then clear search box
-                self.key_list.selection_set(i)
-                self.key_list.see(i)
-                self.view_flight_data()
-                self.search_entry.delete(0, tk.END)
-            else:
+        # look the database key requested up in the database
+        if query and self.store.get_flight(query) is not None:
 
-                # delete search box text and ignore user query
-                self.search_entry.delete(0, tk.END)
+            # focus on selection and populate main tab entries with the
+            # data requested
+            self.key_list.select_key(query)
+            self.view_flight_data()
 
-    def generate_routemap(self, event=None):
-        """Generates a matplotlib map to visualise the selected flight's route."""
+        # clear search box, ignoring unknown user queries
+        self.search_entry.delete(0, tk.END)
 
-        # clear main tab entries and set status label
-        self.clear_fields()
-        self.label_status['text'] = "Building route map, the operation " \
-                                    "may take a while..."
+    def launch_routemap(self, event=None):
+        """Opens a map of the selected flight's route."""
         try:
 
             # grab user selected key
-            index = self.key_list.curselection()
-            selection = self.key_list.get(index)
-            selection = str(selection)
-
-            # launch routemap tab
-            self.tab_routemap = RoutemapTab(key=selection,
-                                            is_pickled=self.map_pickle)
-            self.notebook.add(self.tab_routemap, text="Routemap  ")
-            self.notebook.select(self.tab_routemap)
-
-            # focus on tab
-            self.tab_routemap.grab_set()
-            self.tab_routemap.focus()
-
-            # disable menu options
-            self.disable_menu_options()
+            selection = self.key_list.selected_key()
 
         # warn the user if he has failed to select a key
         except tk.TclError:
-            pass
             self.label_status['text'] = "Error..."
             box.showwarning(title='No flight selected',
                             message='Select a flight from the keys list!')
+            return
+        self.open_map('route', selection)
+
+    def launch_all_routes_map(self, event=None):
+        """Opens a map of every route flown by user."""
+        self.open_map('routes')
+
+    def launch_airport_map(self, event=None):
+        """Opens a map of all airports visited by user."""
+        self.open_map('airports')
 
-    def launch_routemap(self):
-        """Threading method for generate_routemap function."""
-        self.label_status['text'] = "Building route map..."
-        run_thread = Thread(target=self.generate_routemap)
-        run_thread.start()
+    def open_map(self, mode, key=None):
+        """Builds a map on a worker thread and opens it in a new tab.
 
-    def generate_airport_map(self, event=None):
-        """Generates a matplotlib map that plots all airports visited by user."""
+           Reading the map's data, projecting it and drawing its figure are
+           done by RoutemapTab.prepare() on the worker, which waits for the
+           base map if needed. The finished figure is handed back to the Tk
+           main thread through a queue polled with after(), and only then
+           attached to a new tab. A progress bar is shown in the meantime if
+           the base map isn't ready yet; otherwise the map takes too little
+           time for it to be worth showing.
+
+           Args:
+               mode: The RoutemapTab.prepare() mode.
+               key: The flight key of a route map."""
+        if self.map_worker is not None:
+            return
 
         # clear main tab entries and set status label
         self.clear_fields()
-        self.label_status['text'] = "Building airport map, the operation " \
+        self.label_status['text'] = "Building map, the operation " \
                                     "may take a while..."
+        self.disable_menu_options()
+        if not self.base_map.is_ready():
+            self.progress_map.pack()
+            self.progress_map.start()
+        self.map_worker = Thread(target=self.build_map, args=(mode, key),
+                                 daemon=True)
+        self.map_worker.start()
+        self.after(self.MAP_POLL_INTERVAL, self.poll_map)
+
+    def build_map(self, mode, key):
+        """Builds a map figure and queues the result; runs on the worker."""
+        try:
+            self.map_results.put(RoutemapTab.prepare(
+                self.map_renderer, self.store, mode, key))
+        except Exception as error:  # reported by poll_map on the main thread
+            self.map_results.put(error)
 
-        # launch airport plot map tab
-        self.tab_airportmap = RoutemapTab(is_route=False,
-                                          is_pickled=self.map_pickle)
-        self.notebook.add(self.tab_airportmap, text="Routemap  ")
-        self.notebook.select(self.tab_airportmap)
+    def poll_map(self):
+        """Shows the worker's map on a new tab once it is ready."""
+        try:
+            result = self.map_results.get_nowait()
+        except queue.Empty:
+            self.after(self.MAP_POLL_INTERVAL, self.poll_map)
+            return
+        self.map_worker = None
+        self.progress_map.stop()
+        self.progress_map.pack_forget()
+
+        if isinstance(result, Exception):
+            self.enable_menu_options()
+            try:
+                if self.tab_stats.winfo_exists():
 
-        # focus on tab
-        self.tab_airportmap.grab_set()
-        self.tab_airportmap.focus()
+                    # ensure view statistics menu option remains disabled
+                    self.disable_menu_statistics()
 
-        # disable menu options
-        self.disable_menu_options()
+            # ignore attribute error when statistics tab is not open
+            except AttributeError:
+                pass
+            self.label_status['text'] = "Error..."
+            if isinstance(result, sqlite3.Error):
+                box.showwarning('Error', 'Oops, something went wrong!'
+                                         '\nThe database appears not'
+                                         '\nto be working properly.')
+            else:
+                box.showwarning('Error', 'Oops, something went wrong!'
+                                         '\nThe map could not be drawn.')
+            return
+
+        # launch routemap tab
+        self.tab_routemap = RoutemapTab(map_figure=result)
+        self.notebook.add(self.tab_routemap, text="Routemap  ")
+        self.notebook.select(self.tab_routemap)
 
-    def launch_airport_map(self):
-        """Threading method for launch_airport_map function."""
-        self.label_status['text'] = "Building airport map..."
-        run_thread = Thread(target=self.generate_airport_map)
-        run_thread.start()
+        # focus on tab
+        self.tab_routemap.grab_set()
+        self.tab_routemap.focus()
 
     def view_credits(self):
         """ Opens a new window providing credits information."""
@@ -2536,7 +4927,8 @@ class Gui(tk.Frame):
         """Imports data from other database.kr sqlite files.
 
            Allows users to conveniently import flight data using
-           tkinter's filedialog facility."""
+           tkinter's filedialog facility. The imported flights can either be
+           merged with the current ones or replace them."""
 
         # find path to desktop and open filedialog.askopenfilename
         user = os.path.expanduser('~')
@@ -2546,29 +4938,143 @@ class Gui(tk.Frame):
                                            filetypes=[('Kerosene datafile',
                                                        '*.kr')])
 
-        # if a valid file is found alert the user about overwrite risks
+        # the open database can be neither merged with nor replaced by itself
+        try:
+            same_file = bool(database_file) and os.path.samefile(
+                database_file, self.store.path)
+        except OSError:
+            same_file = False
+        if same_file:
+            box.showwarning('Error', 'The selected file is the database'
+                                     '\ncurrently in use and cannot be'
+                                     '\nimported.')
+            return
+
+        # if a valid file is found ask the user whether to merge it with the
+        # current flight data or to replace them
         if database_file:
-            query = box.askokcancel('Warning',
-                                    'Importing a new database will erase'
-                                    '\nprevious flight data, continue?')
+            query = box.askyesnocancel('Import',
+                                       'Merge the imported flights with your'
+                                       '\ncurrent flight data?'
+                                       '\n\nYes: merge, keeping current flights'
+                                       '\nNo: replace current flight data'
+                                       '\nCancel: abort import')
             if query is True:
 
+                # merge selected database.kr file
+                try:
+                    merged, skipped = self.store.merge(database_file)
+                    box.showinfo('Success', '{:d} flights merged, {:d} '
+                                            'duplicates skipped'.format(
+                                                merged, skipped))
+                except sqlite3.Error:
+                    box.showwarning('Error', 'Oops, something went wrong!'
+                                             '\nThe selected file could not'
+                                             '\nbe merged.')
+            elif query is False:
+                query = box.askokcancel('Warning',
+                                        'Importing a new database will erase'
+                                        '\nprevious flight data, continue?')
+                if query is not True:
+                    return
+
                 # import selected database.kr file
-                os.remove('data/database.kr')
-                copy(database_file, 'data/')
+                self.store.close()
+                os.remove(DATABASE_PATH)
+                copy(database_file, DATABASE_PATH)
                 box.showinfo('Success', 'Database successfully imported')
-                self.populate_list()
+            else:
+                return
+            self.populate_list()
+            try:
+                if kerosene.tab_stats.winfo_exists():
+
+                    # update stats if tab exists
+                    kerosene.tab_stats.update_data()
+                else:
+                    pass
+
+            # ignore attribute error when statistics tab is not open
+            except AttributeError:
+                pass
+
+    def import_flights(self, event=None):
+        """Adds flights read from CSV or JSON files to the database.
+
+           Unlike import_database the flights already stored are kept. Missing
+           airport details are looked up from the records' IATA codes and the
+           import speed is reported to the user."""
+
+        # find path to desktop and open filedialog.askopenfilename
+        user = os.path.expanduser('~')
+        desktop = user + '\\Desktop'
+        flights_file = fd.askopenfilename(initialdir=desktop,
+                                          filetypes=[('Flight data',
+                                                      '*.csv *.json'),
+                                                     ('CSV file', '*.csv'),
+                                                     ('JSON file', '*.json')])
+        if not flights_file:
+            return
+
+        self.label_status['text'] = "Importing flights..."
+        self.update_idletasks()
+        reader = FlightFileReader(flights_file)
+        try:
+            start = time.time()
+            count = self.store.bulk_insert(reader)
+            elapsed = max(time.time() - start, 0.001)
+            box.showinfo('Success', '{:d} flights imported in {:.1f} seconds'
+                                    '\n({:.0f} rows/second)'
+                                    '\n{:d} invalid records skipped'
+                         .format(count, elapsed, count / elapsed,
+                                 reader.skipped))
+        except (OSError, ValueError, KeyError, TypeError):
+            box.showwarning('Error', 'The selected file could not be read.'
+                                     '\nNo flights have been imported.')
+        except sqlite3.Error:
+            box.showwarning('Error', 'Oops, something went wrong!'
+                                     '\nThe database appears not'
+                                     '\nto be working properly.')
+        finally:
+            self.populate_list()
+            try:
+                if kerosene.tab_stats.winfo_exists():
+
+                    # update stats if tab exists
+                    kerosene.tab_stats.update_data()
+                else:
+                    pass
+
+            # ignore attribute error when statistics tab is not open
+            except AttributeError:
+                pass
+            self.label_status['text'] = "Idle..."
+
+    def check_statistics(self, event=None):
+        """Checks the statistics rollups and rebuilds them if needed."""
+        self.label_status['text'] = "Checking statistics..."
+        self.update_idletasks()
+        try:
+            if StatisticsEngine.check_rollups(self.store):
+                box.showinfo('Success', 'Statistics are up to date')
+            else:
+                box.showinfo('Success', 'Statistics were out of date'
+                                        '\nand have been rebuilt')
                 try:
                     if kerosene.tab_stats.winfo_exists():
 
                         # update stats if tab exists
                         kerosene.tab_stats.update_data()
-                    else:
-                        pass
 
                 # ignore attribute error when statistics tab is not open
                 except AttributeError:
                     pass
+        except sqlite3.Error:
+            box.showwarning('Error', 'Oops, something went wrong!'
+                                     '\nThe database appears not'
+                                     '\nto be working properly.')
+        finally:
+            self.label_status['text'] = "Idle..."
 
     def switch_to_tab_1(self, event=None):
         """ Switches notebook focus to the program's main tab."""
@@ -2580,14 +5086,17 @@ class Gui(tk.Frame):
            Disables options in File, Edit, View, Plot, Tools and Info submenus
            on program menu."""
         self.file.entryconfigure("Import Database", state="disabled")
+        self.file.entryconfigure("Import Flights", state="disabled")
         self.edit.entryconfigure("Upload Flight", state="disabled")
         self.edit.entryconfigure("Edit Flight", state="disabled")
         self.edit.entryconfigure("Delete Flight", state="disabled")
         self.view.entryconfigure("Flight Details", state="disabled")
         self.view.entryconfigure("Statistics", state="disabled")
         self.plot.entryconfigure("Flight Route", state="disabled")
+        self.plot.entryconfigure("All Routes", state="disabled")
         self.plot.entryconfigure("Airports", state="disabled")
         self.tools.entryconfigure("Flight Finder", state="disabled")
+        self.tools.entryconfigure("Check Statistics", state="disabled")
         self.info.entryconfigure("View Help", state="disabled")
         self.info.entryconfigure("About ...", state="disabled")
 
@@ -2597,14 +5106,17 @@ class Gui(tk.Frame):
            Re-enables options in File, Edit, View, Plot, Tools and Info submenus
            on program menu."""
         self.file.entryconfigure("Import Database", state="normal")
+        self.file.entryconfigure("Import Flights", state="normal")
         self.edit.entryconfigure("Upload Flight", state="normal")
         self.edit.entryconfigure("Edit Flight", state="normal")
         self.edit.entryconfigure("Delete Flight", state="normal")
         self.view.entryconfigure("Flight Details", state="normal")
         self.view.entryconfigure("Statistics", state="normal")
         self.plot.entryconfigure("Flight Route", state="normal")
+        self.plot.entryconfigure("All Routes", state="normal")
         self.plot.entryconfigure("Airports", state="normal")
         self.tools.entryconfigure("Flight Finder", state="normal")
+        self.tools.entryconfigure("Check Statistics", state="normal")
         self.info.entryconfigure("View Help", state="normal")
         self.info.entryconfigure("About ...", state="normal")
 
@@ -2616,57 +5128,19 @@ class Gui(tk.Frame):
         """Enables view statistics option on program menu."""
         self.view.entryconfigure("Statistics", state="normal")
 
-    @staticmethod
-    def pickle_map():
-        """Generates the base matplotlib map used by the program and caches it."""
-        matplotlib.use('TkAgg')
-        fig = Figure(figsize=(6, 3))
-
-        # set map background color
-        fig.patch.set_facecolor('lightgray')
-
-        ax1 = fig.add_subplot(111)
-        m = Basemap(projection='robin',
-                    lat_0=43.0000, lon_0=12.0000,
-                    resolution='c', area_thresh=100000,
-                    ax=ax1)
-
-        # build map and adjust settings
-        m.drawcoastlines(linewidth=1, color="black")
-        m.drawcountries(color="#ddaa66")
-        m.fillcontinents(color='#ddaa66', lake_color="#b0c4de")
-        m.drawmapboundary(linewidth=2, color="black", fill_color="#b0c4de")
-        m.drawmeridians(np.arange(0, 360, 30), color="black")
-        m.drawparallels(np.arange(-90, 90, 30), color="black")
-        # m.bluemarble()
-
-        return pickle.dumps((m, fig))
-
     @staticmethod
     def view_help():
         """Launches program help file."""
         os.startfile("docs\\kerosene_docs.chm")
         # TODO: help file needs to be updated to take into account added functionalities; like plot maps for instance
 
-    @staticmethod
-    def string_to_timedelta(string=''):
-        """This function converts datetime string representations saved in
-        the database."""
-        split_string = string.split(':')
-        converted_string = dt.timedelta(hours=int(split_string[0]),
-                                        minutes=int(split_string[1]),
-                                        seconds=int(split_string[2]))
-        return converted_string
-
     def generate_spreadsheet(self, event=None):
         """Allows users to export all flight data to .xlsx spreadsheet
         format, the file is saved on the desktop."""
 
         # update status label and set database
         self.label_status['text'] = "Generating spreadsheet..."
-        database = sqlite3.connect('data/database.kr')
         try:
-            cursor = database.cursor()
 
             # find desktop path
             user = os.path.expanduser('~')
@@ -2692,12 +5166,11 @@ class Gui(tk.Frame):
             ws1.cell('O1').value = 'Destination longitude'
 
             # loop through each record and assign variables to data
-            for i, flight in enumerate(cursor.execute('SELECT * FROM '
-                                                      'flight_data')):
+            for i, flight in enumerate(self.store.iter_flights()):
                 date = flight[0]
                 flight_number = flight[1]
                 plane_model = flight[2]
-                flight_duration = flight[5]
+                flight_duration = format_duration(flight[5])
                 carrier = flight[8]
                 departure = flight[6]
                 destination = flight[7]
@@ -2739,8 +5212,7 @@ class Gui(tk.Frame):
                                      '\nto be working properly.')
         finally:
 
-            # close database and update status label
-            database.close()
+            # update status label
             self.label_status['text'] = "Idle..."
 
     def generate_json(self, event=None):
@@ -2749,23 +5221,21 @@ class Gui(tk.Frame):
 
         # update status label, connect to database and set database dictionary
         self.label_status['text'] = "Exporting data to JSON..."
-        database = sqlite3.connect('data/database.kr')
         json_database = {}
         try:
-            cursor = database.cursor()
 
             # find desktop path
             user = os.path.expanduser('~')
             desktop = user + '\\Desktop'
 
             # loop through each record and assign variables to data
-            for flight in cursor.execute('SELECT * FROM flight_data'):
+            for flight in self.store.iter_flights():
                 date = flight[0]
                 flight_number = flight[1]
                 plane_model = flight[2]
-                take_off_time = flight[3]
-                landing_time = flight[4]
-                flight_duration = flight[5]
+                take_off_time = format_duration(flight[3])
+                landing_time = format_duration(flight[4])
+                flight_duration = format_duration(flight[5])
                 carrier = flight[8]
                 departure = flight[6]
                 destination = flight[7]
@@ -2813,8 +5283,7 @@ class Gui(tk.Frame):
                                      '\nto be working properly.')
         finally:
 
-            # close database and update status label
-            database.close()
+            # update status label
             self.label_status['text'] = "Idle..."
 
     @staticmethod
@@ -2835,19 +5304,9 @@ class Gui(tk.Frame):
         # create backup copy and save to desktop
         else:
             os.mkdir(desktop + '\\kerosene_backup')
-            copy('data/database.kr', desktop + '\\kerosene_backup')
+            copy(DATABASE_PATH, desktop + '\\kerosene_backup')
             box.showinfo('Success', 'Backup created!')
 
-    @staticmethod
-    def format_timedelta(time_to_format):
-        """Formats timedelta objects.
-
-           Method displays timedelta time in a HOURS:MINUTES:SECONDS format."""
-        minutes, seconds = divmod(time_to_format.seconds +
-                                  time_to_format.days * 86400, 60)
-        hours, minutes = divmod(minutes, 60)
-        return '{:d}:{:02d}:{:02d}'.format(hours, minutes, seconds)
-
     @staticmethod
     def quit_program():
         """Method to safely quit the program.
@@ -2865,37 +5324,58 @@ class Gui(tk.Frame):
             data = {'time': current_time}
             json.dump(data, file)
 
+        # close database
+        kerosene.store.close()
+
         # quit program
         root.destroy()
 
-    @staticmethod
-    def build_iata_list():
-        """Threading method for upload_iatas function."""
-
-        # invoke global constant
-        global IATA_CODE_LIST
-
-        # connect to database
-        database = sqlite3.connect('data/airports_data.sqlite')
-        cursor = database.cursor()
-        iatas = cursor.execute('SELECT iata FROM airports')
-        sorted_iatas = (iata[0] for iata in sorted(iatas))
-
-        # loop through IATA codes and append to global iata code list
-        for iata in sorted_iatas:
-
-            # ignore first '---' iata field
-            if iata == '---':
-                pass
-            else:
-                IATA_CODE_LIST.append(iata)
-
-        # close database
-        database.close()
-
 
 # Launch program ---------------------------------------------------------------
 if __name__ == "__main__":
+
+    # let the map export workers of a frozen Windows build start as workers
+    # instead of running the command line parser again
+    multiprocessing.freeze_support()
+
+    # command line build steps
+    parser = argparse.ArgumentParser(description='Kerosene flight database')
+    parser.add_argument('--build-airports', nargs='?', const=AIRPORTS_PATH,
+                        metavar='SOURCE',
+                        help='write an optimized copy of the SOURCE airports '
+                             'database to ' + AIRPORTS_PATH + ' and exit')
+    parser.add_argument('--build-geometry', action='store_true',
+                        help='write the projected base map geometry to ' +
+                             GEOMETRY_PATH + ' and exit')
+    parser.add_argument('--export-maps', metavar='DIRECTORY',
+                        help='write the all routes map and one airports map '
+                             'per year to DIRECTORY and exit')
+    parser.add_argument('--flights', nargs='+', default=[], metavar='KEY',
+                        help='with --export-maps, also write the route maps '
+                             'of these flights')
+    parser.add_argument('--map-format', choices=EXPORT_FORMATS,
+                        default=EXPORT_FORMATS[0],
+                        help='image format of exported maps')
+    parser.add_argument('--map-dpi', type=int, default=EXPORT_DPI,
+                        help='resolution of exported maps')
+    parser.add_argument('--map-workers', type=int,
+                        help='number of processes rendering exported maps')
+    args = parser.parse_args()
+    if args.build_airports:
+        build_airports_database(args.build_airports, AIRPORTS_PATH)
+        sys.exit()
+    if args.build_geometry:
+        build_map_geometry(GEOMETRY_PATH)
+        sys.exit()
+    if args.export_maps:
+        store = FlightStore()
+        exporter = MapExporter(store, args.export_maps, args.map_format,
+                               args.map_dpi, args.map_workers)
+        for path in exporter.export(exporter.jobs(
+                args.flights, store.list_years(), all_routes=True)):
+            print(path)
+        sys.exit()
+
     root = tk.Tk()
     root.resizable(width=False, height=False)
     root.title("Kerosene 1.0.0")